@@ -0,0 +1,378 @@
+"""Benchmarks de las etapas pesadas del procesamiento de incendios.
+
+Uso: python benchmark.py [clustering] [triangulos] [poligonos] [sobreposiciones] [codificacion]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from scipy.spatial import Delaunay
+from shapely.geometry import Point, Polygon
+from shapely.ops import unary_union
+
+from fire_processor import FireProcessor
+from fire_clustering import EventClusterer
+from fire_geometry import event_polygons, filter_triangles, encode_geometries, simplify_geometries
+
+# Extensión aproximada de Ecuador continental en EPSG:32717
+X_RANGO = (500_000, 1_100_000)
+Y_RANGO = (9_500_000, 10_200_000)
+
+
+def detecciones_sinteticas(n, dias=10, semilla=42):
+    """Genera n detecciones agrupadas en focos que crecen durante varios días"""
+    rng = np.random.default_rng(semilla)
+    n_focos = max(1, n // 40)
+
+    centros_x = rng.uniform(*X_RANGO, n_focos)
+    centros_y = rng.uniform(*Y_RANGO, n_focos)
+    inicio_foco = rng.integers(0, dias, n_focos)
+
+    foco = rng.integers(0, n_focos, n)
+    desfase = rng.integers(0, 4, n)
+    dia = np.minimum(inicio_foco[foco] + desfase, dias - 1)
+
+    # Un 10% de detecciones aisladas (ruido) fuera de los focos
+    ruido = rng.random(n) < 0.1
+    x = np.where(ruido, rng.uniform(*X_RANGO, n), centros_x[foco] + rng.normal(0, 600, n))
+    y = np.where(ruido, rng.uniform(*Y_RANGO, n), centros_y[foco] + rng.normal(0, 600, n))
+
+    fechas = pd.Timestamp('2025-08-01') + pd.to_timedelta(dia, unit='D')
+    return gpd.GeoDataFrame(
+        {'ACQ_DATE': fechas},
+        geometry=gpd.points_from_xy(x, y),
+        crs='EPSG:32717'
+    )
+
+
+def clustering_original(incendios, distance_threshold=1000, time_lag=3):
+    """Flood fill original de FireProcessor.assign_event_ids (referencia).
+
+    Espera los datos ya ordenados por ACQ_DATE y con índice 0..n-1.
+    """
+    incendios = incendios.copy()
+    incendios['evento_id'] = None
+    evento_id = 1
+
+    for i in range(len(incendios)):
+        if pd.isna(incendios.loc[i, 'evento_id']):
+            incendios.loc[i, 'evento_id'] = evento_id
+            puntos_evento = [i]
+
+            while True:
+                nuevos_puntos = []
+
+                for punto_idx in puntos_evento:
+                    punto_base = incendios.iloc[punto_idx]
+                    sin_clasificar = incendios[incendios['evento_id'].isna()]
+
+                    if sin_clasificar.empty:
+                        continue
+
+                    diferencia_tiempo = (sin_clasificar['ACQ_DATE'] - punto_base['ACQ_DATE']).dt.days
+                    tiempo_valido = (diferencia_tiempo >= 0) & (diferencia_tiempo <= time_lag)
+                    candidatos_temporales = sin_clasificar[tiempo_valido]
+
+                    if candidatos_temporales.empty:
+                        continue
+
+                    distancias = candidatos_temporales.geometry.distance(punto_base.geometry)
+                    candidatos_finales = candidatos_temporales[distancias <= distance_threshold]
+
+                    for idx in candidatos_finales.index:
+                        incendios.loc[idx, 'evento_id'] = evento_id
+                        nuevos_puntos.append(idx)
+
+                if not nuevos_puntos:
+                    break
+
+                puntos_evento = nuevos_puntos
+
+            evento_id += 1
+
+    return incendios['evento_id'].astype(int).values
+
+
+def bench_clustering():
+    print("=== Clustering espacial-temporal (assign_event_ids) ===")
+    processor = FireProcessor()
+    processor.incremental = False
+
+    for n in [1_000, 2_000]:
+        datos = detecciones_sinteticas(n).sort_values('ACQ_DATE').reset_index(drop=True)
+        esperado = clustering_original(datos, processor.distance_threshold, processor.time_lag)
+        obtenido = EventClusterer(processor.distance_threshold, processor.time_lag).fit(
+            datos.geometry.x.values, datos.geometry.y.values, datos['ACQ_DATE'].values
+        )
+        estado = "OK" if np.array_equal(esperado, obtenido) else "DIFERENTE"
+        print(f"Equivalencia con flood fill original (n={n}): {estado}")
+
+    for n in [1_000, 10_000, 50_000, 100_000, 200_000]:
+        datos = detecciones_sinteticas(n)
+        inicio = time.perf_counter()
+        resultado = processor.assign_event_ids(datos)
+        duracion = time.perf_counter() - inicio
+        print(f"n={n:>7}: {duracion:8.2f} s  ({resultado['evento_id'].nunique()} eventos)")
+
+
+def triangulos_original(puntos, simplices):
+    """Filtro original de create_polygons, triángulo por triángulo (referencia)"""
+    triangulos = []
+    for simplex in simplices:
+        triangle = Polygon([puntos[i] for i in simplex])
+        coords = list(triangle.exterior.coords)
+        max_lado = max([Point(coords[i]).distance(Point(coords[i + 1])) for i in range(len(coords) - 1)])
+        if max_lado <= 2000 and triangle.area / 10000 <= 500:
+            triangulos.append(triangle)
+    return triangulos
+
+
+def bench_triangulos():
+    print("=== Filtro de triángulos (create_polygons) ===")
+    rng = np.random.default_rng(7)
+
+    for n in [500, 2_000, 5_000, 20_000]:
+        # Un evento grande: puntos dispersos en ~15 km con huecos
+        puntos = rng.normal(0, 4_000, (n, 2)) + rng.choice([-6_000, 0, 6_000], (n, 2))
+        simplices = Delaunay(puntos).simplices
+
+        inicio = time.perf_counter()
+        esperado = unary_union(triangulos_original(puntos, simplices))
+        t_original = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        obtenido = unary_union(filter_triangles(puntos, simplices))
+        t_vectorizado = time.perf_counter() - inicio
+
+        estado = "OK" if obtenido.equals_exact(esperado, 0) else "DIFERENTE"
+        print(f"n={n:>6}: original {t_original:7.3f} s | vectorizado {t_vectorizado:7.3f} s | geometría {estado}")
+
+
+def poligonos_original(puntos, fechas):
+    """Polígonos diarios de create_polygons antes de user-005: una triangulación
+    completa por día (referencia). Espera ``puntos`` ordenados por ``fechas``.
+    """
+    resultados = []
+    poligono_anterior = None
+    dias, inicios = np.unique(fechas, return_index=True)
+
+    for fecha_actual, fin in zip(dias, np.append(inicios[1:], len(puntos))):
+        acumulados = puntos[:fin]
+        if fin >= 3:
+            try:
+                triangulos = filter_triangles(acumulados, Delaunay(acumulados).simplices)
+                if len(triangulos):
+                    poligono_anterior = unary_union([shapely.union_all(triangulos), poligono_anterior])
+                poligono_actual = poligono_anterior
+            except Exception:
+                poligono_actual = poligono_anterior
+        elif fin == 2:
+            poligono_actual = shapely.MultiPoint(acumulados).convex_hull
+        else:
+            poligono_actual = Point(acumulados[0])
+        resultados.append((fecha_actual, poligono_actual))
+    return resultados
+
+
+def diferencia_poligonos(obtenidos, esperados):
+    """Mayor diferencia simétrica diaria, relativa al área de referencia (inf si
+    no coinciden las fechas o falta el polígono de un día).
+    """
+    if [fecha for fecha, _ in obtenidos] != [fecha for fecha, _ in esperados]:
+        return np.inf
+    diferencia = 0.0
+    for (_, obtenido), (_, esperado) in zip(obtenidos, esperados):
+        if obtenido is None or esperado is None:
+            if obtenido is not esperado:
+                return np.inf
+            continue
+        diferencia = max(diferencia, obtenido.symmetric_difference(esperado).area / max(esperado.area, 1))
+    return diferencia
+
+
+def frente_sintetico(rng, n, dias):
+    """Frente de fuego que avanza ~n/dias detecciones por día"""
+    x = 800_000 + np.cumsum(rng.normal(0, 40, n))
+    y = 9_800_000 + rng.normal(0, 3_000, n)
+    fechas = np.datetime64('2025-08-01') + np.sort(rng.integers(0, dias, n)).astype('timedelta64[D]')
+    return np.column_stack([x, y]), fechas
+
+
+def malla_sintetica(rng, n, dias):
+    """Centros de píxel VIIRS (~375 m) redondeados a 5 decimales como los entrega
+    FIRMS, con detecciones repetidas: duplicados y puntos casi cocirculares.
+
+    En una malla la triangulación de Delaunay no es única (cuatro puntos de una
+    celda son cocirculares) y qhull desempata distinto en modo incremental y
+    completo. Ambas son válidas, pero cuando las diagonales rondan los 2000 m
+    el filtro de lados conserva triángulos distintos, así que aquí se espera una
+    diferencia pequeña y no cero.
+    """
+    lado = int(np.sqrt(n)) + 1
+    celdas = rng.integers(0, lado, (n, 2))
+    lon = np.round(-79.5 + celdas[:, 0] * 0.00337, 5)
+    lat = np.round(-2.0 + celdas[:, 1] * 0.00337, 5)
+    puntos = gpd.GeoSeries(gpd.points_from_xy(lon, lat), crs='EPSG:4326').to_crs('EPSG:32717')
+    fechas = np.datetime64('2025-08-01') + np.sort(rng.integers(0, dias, n)).astype('timedelta64[D]')
+    return np.column_stack([puntos.x.values, puntos.y.values]), fechas
+
+
+def bench_poligonos():
+    print("=== Polígonos diarios de un evento largo (create_polygons) ===")
+    processor = FireProcessor()
+    rng = np.random.default_rng(11)
+
+    for generar in [frente_sintetico, malla_sintetica]:
+        for n in [1_000, 5_000, 20_000]:
+            for dias in [5, 20]:
+                puntos, fechas = generar(rng, n, dias)
+                evento = gpd.GeoDataFrame(
+                    {'ACQ_DATE': pd.to_datetime(fechas), 'evento_id': 1},
+                    geometry=gpd.points_from_xy(puntos[:, 0], puntos[:, 1]),
+                    crs='EPSG:32717'
+                )
+
+                inicio = time.perf_counter()
+                poligonos = processor.create_polygons(evento)
+                duracion = time.perf_counter() - inicio
+
+                inicio = time.perf_counter()
+                esperado = poligonos_original(puntos, fechas)
+                t_original = time.perf_counter() - inicio
+
+                diferencia = diferencia_poligonos(event_polygons(puntos, fechas), esperado)
+                print(f"{generar.__name__}, n={n:>6}, {dias:>2} días: original {t_original:7.2f} s | "
+                      f"incremental {duracion:7.2f} s  ({len(poligonos)} polígonos, dif. máx. {diferencia:.4%})")
+
+
+def sobreposiciones_original(incendios):
+    """remove_overlaps original, evento por evento y fila por fila (referencia)"""
+    incendios = incendios.sort_values(['evento_id', 'fecha']).reset_index(drop=True)
+    nuevos_poligonos = []
+
+    for evento in incendios['evento_id'].unique():
+        geometria_acumulada = None
+        for _, row in incendios[incendios['evento_id'] == evento].iterrows():
+            if row.geometry.is_empty:
+                continue
+            if geometria_acumulada is None:
+                geom_unica = row.geometry
+            else:
+                try:
+                    geom_unica = row.geometry.difference(geometria_acumulada)
+                except Exception:
+                    continue
+            if not geom_unica.is_empty:
+                nuevo_row = row.copy()
+                nuevo_row.geometry = geom_unica
+                nuevos_poligonos.append(nuevo_row)
+                geometria_acumulada = geom_unica if geometria_acumulada is None else \
+                    unary_union([geometria_acumulada, geom_unica])
+
+    if not nuevos_poligonos:
+        return gpd.GeoDataFrame()
+    return gpd.GeoDataFrame(nuevos_poligonos, crs='EPSG:32717')
+
+
+def id_unico_original(fecha, geometry):
+    """generate_unique_id original, un evento a la vez (referencia)"""
+    try:
+        juliano = fecha.timetuple().tm_yday
+        centroid = geometry.centroid
+        lng_str = str(abs(centroid.x)).replace('.', '')[:3].ljust(3, '0')
+        lat_str = str(abs(centroid.y)).replace('.', '')[:3].ljust(3, '0')
+        return int(f"{juliano:03d}{lng_str}{lat_str}")
+    except Exception:
+        return int(f"{fecha.strftime('%j')}000000")
+
+
+def poligonos_de_eventos(processor, n_eventos, dias=8, semilla=3):
+    """Polígonos acumulados por día de ``n_eventos`` eventos, como los entrega create_polygons"""
+    rng = np.random.default_rng(semilla)
+    filas = []
+    for evento in range(1, n_eventos + 1):
+        centro = [rng.uniform(*X_RANGO), rng.uniform(*Y_RANGO)]
+        n = int(rng.integers(5, 60))
+        puntos = centro + rng.normal(0, 500, (n, 2))
+        fechas = pd.Timestamp('2025-08-01') + pd.to_timedelta(np.sort(rng.integers(0, dias, n)), unit='D')
+        filas.append(gpd.GeoDataFrame({'ACQ_DATE': fechas, 'evento_id': evento},
+                                      geometry=gpd.points_from_xy(puntos[:, 0], puntos[:, 1]),
+                                      crs='EPSG:32717'))
+    return processor.create_polygons(pd.concat(filas, ignore_index=True))
+
+
+def bench_sobreposiciones():
+    print("=== Área nueva por día e IDs únicos (remove_overlaps, assign_location_and_calculate) ===")
+    processor = FireProcessor()
+
+    for n_eventos in [100, 1_000]:
+        poligonos = poligonos_de_eventos(processor, n_eventos)
+
+        inicio = time.perf_counter()
+        esperado = sobreposiciones_original(poligonos)
+        t_original = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        obtenido = processor.remove_overlaps(poligonos)
+        t_vectorizado = time.perf_counter() - inicio
+
+        iguales = len(esperado) == len(obtenido) and all(
+            a.symmetric_difference(b).area < 1e-6 for a, b in zip(esperado.geometry, obtenido.geometry)
+        )
+        print(f"{n_eventos:>5} eventos: original {t_original:6.2f} s | vectorizado {t_vectorizado:6.2f} s | "
+              f"geometría {'OK' if iguales else 'DIFERENTE'}")
+
+        primeros = obtenido.drop_duplicates('evento_id')
+        inicio = time.perf_counter()
+        esperados = [id_unico_original(f, g) for f, g in zip(primeros['fecha'], primeros.geometry)]
+        t_original = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        ids = processor.generate_unique_ids(primeros['fecha'], primeros.geometry.values)
+        t_vectorizado = time.perf_counter() - inicio
+        estado = "OK" if np.array_equal(esperados, ids) else "DIFERENTE"
+        print(f"{'':>5} IDs únicos: original {t_original:6.3f} s | vectorizado {t_vectorizado:6.3f} s | {estado}")
+
+
+def bench_codificacion():
+    print("=== Codificación de geometrías para Supabase (save_to_supabase) ===")
+    rng = np.random.default_rng(5)
+    n = 5_000
+
+    # Perímetros irregulares de ~200 vértices en EPSG:32717
+    centros = np.column_stack([rng.uniform(*X_RANGO, n), rng.uniform(*Y_RANGO, n)])
+    angulos = np.linspace(0, 2 * np.pi, 200, endpoint=False)
+    radios = rng.uniform(500, 3_000, (n, 1)) * (1 + 0.2 * rng.random((n, 200)))
+    anillos = np.stack([np.cos(angulos) * radios, np.sin(angulos) * radios], axis=-1) + centros[:, None, :]
+    poligonos = gpd.GeoSeries(shapely.polygons(anillos), crs='EPSG:32717')
+
+    inicio = time.perf_counter()
+    original = poligonos.to_crs('EPSG:4326').apply(lambda x: x.wkt)
+    t_original = time.perf_counter() - inicio
+    bytes_original = sum(map(len, original))
+    print(f"WKT completo (apply):  {t_original:6.2f} s  {bytes_original / 1e6:7.1f} MB")
+
+    for formato, tolerancia in [('wkt', 0), ('wkb', 0), ('ewkb', 0), ('wkt', 20)]:
+        inicio = time.perf_counter()
+        simplificados = gpd.GeoSeries(simplify_geometries(poligonos.values, tolerancia), crs=poligonos.crs)
+        codificados = encode_geometries(simplificados.to_crs('EPSG:4326').values, formato)
+        duracion = time.perf_counter() - inicio
+        tamano = sum(map(len, codificados))
+        print(f"{formato:>4}, simplif. {tolerancia:>2} m: {duracion:6.2f} s  {tamano / 1e6:7.1f} MB "
+              f"({tamano / bytes_original:.0%})")
+
+
+BENCHMARKS = {
+    'clustering': bench_clustering,
+    'triangulos': bench_triangulos,
+    'poligonos': bench_poligonos,
+    'sobreposiciones': bench_sobreposiciones,
+    'codificacion': bench_codificacion,
+}
+
+if __name__ == "__main__":
+    seleccion = sys.argv[1:] or list(BENCHMARKS)
+    for nombre in seleccion:
+        BENCHMARKS[nombre]()
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import threading
+import ee
+
+
+class ClimatologyStore:
+    """Climatología de NDVI (mínimo y máximo por píxel) precalculada como asset de EE.
+
+    Reducir cinco años de MOD13A2 es la parte más pesada del ISC y su
+    resultado no cambia mientras no cambie la ventana histórica. La primera
+    vez que se pide una ventana se lanza una exportación a un asset
+    (``<asset_root>/ndvi_minmax_<inicio>_<fin>``) en la grilla nativa de MODIS
+    y, mientras termina, el pipeline sigue reduciendo en vivo. Cuando el asset
+    está listo se lee directamente. El estado de cada ventana (asset, tarea,
+    estado) se lleva en un registro JSON local para no consultar a EE en cada
+    petición; las tareas en curso se revisan como mucho cada ``check_interval``
+    segundos. Sin ``asset_root`` la climatología siempre se calcula en vivo.
+    """
+
+    def __init__(self, asset_root=None, registro_path=None, check_interval=600):
+        self.asset_root = asset_root.rstrip('/') if asset_root else None
+        self.registro_path = registro_path or os.path.join("data", "cache", "ee_assets.json")
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._registro = self._leer_registro()
+        self._revisado = {}
+
+    def configure(self, asset_root):
+        """Cambia la carpeta de assets (None desactiva la climatología precalculada)"""
+        with self._lock:
+            self.asset_root = asset_root.rstrip('/') if asset_root else None
+
+    @property
+    def enabled(self):
+        return self.asset_root is not None
+
+    def asset_id(self, inicio, fin):
+        return f"{self.asset_root}/ndvi_minmax_{inicio.replace('-', '')}_{fin.replace('-', '')}"
+
+    def ready_asset(self, inicio, fin, exportar=None):
+        """Asset listo para la ventana, o None.
+
+        Si la ventana no tiene asset ni exportación, ``exportar()`` debe devolver
+        (imagen, region) para lanzarla.
+        """
+        if not self.enabled:
+            return None
+
+        asset_id = self.asset_id(inicio, fin)
+        with self._lock:
+            entrada = self._registro.get(asset_id)
+
+            if entrada and entrada['estado'] == 'ready':
+                return asset_id
+
+            if time.monotonic() - self._revisado.get(asset_id, -self.check_interval) < self.check_interval:
+                return None
+            self._revisado[asset_id] = time.monotonic()
+
+            try:
+                if entrada and entrada['estado'] == 'running':
+                    entrada['estado'] = self._estado_tarea(entrada['task_id'])
+                elif self._asset_existe(asset_id):
+                    entrada = {'estado': 'ready', 'task_id': None}
+                elif exportar is not None:
+                    entrada = self._exportar(asset_id, *exportar())
+                else:
+                    return None
+            except Exception as e:
+                print(f"⚠️ Climatología NDVI {asset_id}: {e}")
+                return None
+
+            entrada['ventana'] = [inicio, fin]
+            self._registro[asset_id] = entrada
+            self._guardar_registro()
+
+            return asset_id if entrada['estado'] == 'ready' else None
+
+    def _asset_existe(self, asset_id):
+        try:
+            ee.data.getAsset(asset_id)
+            return True
+        except ee.EEException:
+            return False
+
+    def _estado_tarea(self, task_id):
+        estado = ee.data.getTaskStatus(task_id)[0].get('state')
+        if estado == 'COMPLETED':
+            return 'ready'
+        if estado in ('FAILED', 'CANCELLED', 'CANCEL_REQUESTED', 'UNKNOWN'):
+            # Se volverá a exportar en la siguiente revisión
+            return 'failed'
+        return 'running'
+
+    def _exportar(self, asset_id, imagen, region):
+        # Grilla nativa de MOD13A2 para no remuestrear la climatología
+        proyeccion = ee.Image(
+            ee.ImageCollection("MODIS/061/MOD13A2").first()
+        ).select('NDVI').projection().getInfo()
+
+        tarea = ee.batch.Export.image.toAsset(
+            image=imagen,
+            description=os.path.basename(asset_id),
+            assetId=asset_id,
+            region=region,
+            crs=proyeccion['crs'],
+            crsTransform=proyeccion['transform'],
+            maxPixels=1e13
+        )
+        tarea.start()
+        print(f"📤 Exportando climatología NDVI a {asset_id} (tarea {tarea.id})")
+        return {'estado': 'running', 'task_id': tarea.id, 'creado': time.strftime("%Y-%m-%d %H:%M:%S")}
+
+    def _leer_registro(self):
+        try:
+            with open(self.registro_path) as f:
+                registro = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Las exportaciones fallidas se reintentan
+        return {clave: valor for clave, valor in registro.items() if valor.get('estado') != 'failed'}
+
+    def _guardar_registro(self):
+        try:
+            os.makedirs(os.path.dirname(self.registro_path) or '.', exist_ok=True)
+            temporal = f"{self.registro_path}.tmp"
+            with open(temporal, 'w') as f:
+                json.dump(self._registro, f, indent=2)
+            os.replace(temporal, self.registro_path)
+        except OSError as e:
+            print(f"⚠️ No se guardó el registro de assets: {e}")
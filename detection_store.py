@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from contextlib import closing
+from datetime import datetime
+from scipy.spatial import cKDTree
+
+# evento_id de las detecciones que quedan fuera del periodo procesado: no
+# están pendientes ni pertenecen a ningún evento
+DESCARTADA = -1
+
+# Columnas de la tabla -> nombres usados por FireProcessor
+COLUMNAS = {
+    'source': 'SOURCE',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'acq_date': 'ACQ_DATE',
+    'acq_time': 'ACQ_TIME',
+    'x': 'x',
+    'y': 'y',
+}
+
+
+class DetectionStore:
+    """Almacén local (SQLite) de detecciones FIRMS ya procesadas.
+
+    Cada detección se identifica por fuente, latitud, longitud, fecha y hora de
+    adquisición, y guarda sus coordenadas EPSG:32717 junto con el evento_id que
+    le asignó el último clustering. Así cada ejecución solo procesa lo nuevo y
+    re-agrupa los eventos que esas detecciones tocan.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._crear_tablas()
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def _crear_tablas(self):
+        with self._connect() as con, con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS detecciones (
+                    source TEXT NOT NULL,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    acq_date TEXT NOT NULL,
+                    acq_time INTEGER NOT NULL,
+                    x REAL NOT NULL,
+                    y REAL NOT NULL,
+                    evento_id INTEGER,
+                    PRIMARY KEY (source, latitude, longitude, acq_date, acq_time)
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_detecciones_fecha ON detecciones (acq_date)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_detecciones_evento ON detecciones (evento_id)")
+            con.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)")
+
+    def last_ingestion(self):
+        """Fecha de la última descarga registrada (None si el almacén está vacío)"""
+        with self._connect() as con:
+            fila = con.execute("SELECT valor FROM meta WHERE clave = 'ultima_ingesta'").fetchone()
+        return datetime.fromisoformat(fila[0]) if fila else None
+
+    def mark_ingestion(self, fecha):
+        with self._connect() as con, con:
+            con.execute("INSERT OR REPLACE INTO meta VALUES ('ultima_ingesta', ?)", (fecha.isoformat(),))
+
+    def add(self, incendios):
+        """Guarda las detecciones que aún no estaban en el almacén; devuelve cuántas eran nuevas"""
+        if incendios.empty:
+            return 0
+
+        filas = self._claves(incendios).assign(
+            x=incendios.geometry.x.values,
+            y=incendios.geometry.y.values
+        )
+
+        with self._connect() as con, con:
+            antes = con.total_changes
+            con.executemany(
+                "INSERT OR IGNORE INTO detecciones (source, latitude, longitude, acq_date, acq_time, x, y) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                filas.itertuples(index=False, name=None)
+            )
+            return con.total_changes - antes
+
+    def pending(self):
+        """Detecciones sin evento asignado (nuevas o de una ejecución que no terminó)"""
+        with self._connect() as con:
+            detecciones = pd.read_sql_query(
+                "SELECT source, latitude, longitude, acq_date, acq_time, x, y FROM detecciones "
+                "WHERE evento_id IS NULL",
+                con
+            )
+        return self._formatear(detecciones)
+
+    def related_events(self, nuevos, distance_threshold, time_lag):
+        """evento_id almacenados al alcance de las nuevas detecciones.
+
+        El alcance es transitivo: también entran los eventos al alcance de los ya
+        incluidos. Como el agrupamiento no es simétrico en el tiempo, un evento
+        re-agrupado puede quedarse con puntos de otro que solo toca de forma
+        indirecta; con el cierre ningún vecino queda fuera de la selección y el
+        resultado es el mismo que agrupando todas las detecciones.
+        """
+        if nuevos.empty:
+            return []
+
+        with self._connect() as con:
+            previos = pd.read_sql_query(
+                "SELECT x, y, acq_date, evento_id FROM detecciones WHERE evento_id > 0", con
+            )
+
+        if previos.empty:
+            return []
+
+        arbol = cKDTree(previos[['x', 'y']].values)
+        dias_previos = pd.to_datetime(previos['acq_date']).values.astype('datetime64[D]')
+        eventos_previos = previos['evento_id'].values
+
+        coords = np.column_stack([nuevos.geometry.x.values, nuevos.geometry.y.values])
+        dias = pd.to_datetime(nuevos['ACQ_DATE']).values.astype('datetime64[D]')
+        eventos = set()
+
+        while len(coords):
+            alcanzados = set()
+            for i, candidatos in enumerate(arbol.query_ball_point(coords, distance_threshold)):
+                if not candidatos:
+                    continue
+                candidatos = np.asarray(candidatos)
+                diferencia = np.abs((dias_previos[candidatos] - dias[i]).astype(int))
+                alcanzados.update(eventos_previos[candidatos[diferencia <= time_lag]].tolist())
+
+            # La siguiente vuelta parte de las detecciones de los eventos recién incluidos
+            alcanzados -= eventos
+            eventos |= alcanzados
+            frontera = np.isin(eventos_previos, list(alcanzados))
+            coords = previos[['x', 'y']].values[frontera]
+            dias = dias_previos[frontera]
+
+        return sorted(eventos)
+
+    def load_events(self, evento_ids):
+        """Detecciones almacenadas de los eventos indicados"""
+        if not evento_ids:
+            return self._formatear(pd.DataFrame(columns=list(COLUMNAS)))
+
+        with self._connect() as con:
+            con.execute("CREATE TEMP TABLE eventos_sel (evento_id INTEGER PRIMARY KEY)")
+            con.executemany("INSERT INTO eventos_sel VALUES (?)", ((int(e),) for e in evento_ids))
+            detecciones = pd.read_sql_query(
+                "SELECT source, latitude, longitude, acq_date, acq_time, x, y FROM detecciones "
+                "WHERE evento_id IN (SELECT evento_id FROM eventos_sel)",
+                con
+            )
+        return self._formatear(detecciones)
+
+    def next_event_id(self):
+        with self._connect() as con:
+            maximo = con.execute("SELECT MAX(evento_id) FROM detecciones WHERE evento_id > 0").fetchone()[0]
+        return (maximo or 0) + 1
+
+    def totals(self):
+        """Detecciones agrupadas y eventos distintos que hay en el almacén"""
+        with self._connect() as con:
+            detecciones, eventos = con.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT evento_id) FROM detecciones WHERE evento_id > 0"
+            ).fetchone()
+        return {"detecciones": detecciones, "eventos": eventos}
+
+    def assign_events(self, incendios):
+        """Persiste el evento_id asignado a cada detección"""
+        filas = self._claves(incendios).assign(evento_id=incendios['evento_id'].astype(int).values)
+        columnas = ['evento_id', 'source', 'latitude', 'longitude', 'acq_date', 'acq_time']
+
+        with self._connect() as con, con:
+            con.executemany(
+                "UPDATE detecciones SET evento_id = ? WHERE source = ? AND latitude = ? "
+                "AND longitude = ? AND acq_date = ? AND acq_time = ?",
+                filas[columnas].itertuples(index=False, name=None)
+            )
+
+    def discard(self, incendios):
+        """Marca como descartadas las detecciones pendientes indicadas"""
+        if incendios.empty:
+            return
+        columnas = ['source', 'latitude', 'longitude', 'acq_date', 'acq_time']
+
+        with self._connect() as con, con:
+            con.executemany(
+                f"UPDATE detecciones SET evento_id = {DESCARTADA} WHERE evento_id IS NULL AND source = ? "
+                "AND latitude = ? AND longitude = ? AND acq_date = ? AND acq_time = ?",
+                self._claves(incendios)[columnas].itertuples(index=False, name=None)
+            )
+
+    def prune(self, antes_de):
+        """Elimina detecciones anteriores a la fecha indicada"""
+        with self._connect() as con, con:
+            cursor = con.execute("DELETE FROM detecciones WHERE acq_date < ?", (antes_de.strftime('%Y-%m-%d'),))
+        return cursor.rowcount
+
+    def _formatear(self, detecciones):
+        detecciones = detecciones.rename(columns=COLUMNAS)
+        detecciones['ACQ_DATE'] = pd.to_datetime(detecciones['ACQ_DATE'])
+        return gpd.GeoDataFrame(
+            detecciones.drop(columns=['x', 'y']),
+            geometry=gpd.points_from_xy(detecciones['x'], detecciones['y']),
+            crs='EPSG:32717'
+        )
+
+    def _claves(self, incendios):
+        return pd.DataFrame({
+            'source': incendios['SOURCE'].astype(str).values,
+            'latitude': incendios['latitude'].astype(float).values,
+            'longitude': incendios['longitude'].astype(float).values,
+            'acq_date': pd.to_datetime(incendios['ACQ_DATE']).dt.strftime('%Y-%m-%d').values,
+            'acq_time': incendios['ACQ_TIME'].astype(int).values,
+        })
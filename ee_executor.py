@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+
+class EEBusyError(RuntimeError):
+    """Hay demasiadas llamadas a Earth Engine en curso o en espera"""
+
+
+class EETimeoutError(TimeoutError):
+    """Una llamada a Earth Engine no respondió dentro del tiempo límite"""
+
+
+class EEExecutor:
+    """Pool de hilos acotado para las llamadas bloqueantes de Earth Engine.
+
+    ``getInfo()`` y ``getMapId()`` bloquean hasta que responde el servidor, así
+    que desde los endpoints ``async`` se envían a este pool y se esperan sin
+    detener el event loop. Como mucho ``max_workers`` llamadas corren a la vez
+    y ``max_pending`` pueden estar en curso o en cola; si se supera, la llamada
+    se rechaza con ``EEBusyError`` en lugar de acumular espera. Si una llamada
+    excede su tiempo límite se responde con ``EETimeoutError``; el hilo no se
+    puede interrumpir, así que su cupo se libera cuando termina de verdad.
+    """
+
+    def __init__(self, max_workers=4, max_pending=16, timeout=120):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ee')
+        self._cupos = threading.BoundedSemaphore(max_pending)
+
+    def _enviar(self, funcion, args, kwargs):
+        if not self._cupos.acquire(blocking=False):
+            raise EEBusyError(f"Demasiadas consultas a Earth Engine en curso (máximo {self.max_pending})")
+
+        try:
+            futuro = self.executor.submit(funcion, *args, **kwargs)
+        except Exception:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        return futuro
+
+    async def run(self, funcion, *args, timeout=None, **kwargs):
+        """Ejecuta ``funcion(*args, **kwargs)`` en el pool y espera su resultado"""
+        futuro = self._enviar(funcion, args, kwargs)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), timeout)
+        except asyncio.TimeoutError:
+            raise EETimeoutError(f"Earth Engine no respondió en {timeout} s") from None
+
+    def run_sync(self, funcion, *args, timeout=None, **kwargs):
+        """Como ``run``, para hilos fuera del event loop (p. ej. el scheduler)"""
+        futuro = self._enviar(funcion, args, kwargs)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return futuro.result(timeout)
+        except FuturesTimeoutError:
+            raise EETimeoutError(f"Earth Engine no respondió en {timeout} s") from None
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
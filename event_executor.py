@@ -0,0 +1,43 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+
+def available_cpus():
+    """CPUs disponibles para el proceso (respeta la afinidad del contenedor)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class EventExecutor:
+    """Aplica una función a cada evento, en un pool de procesos o en serie.
+    
+    Los eventos son independientes entre sí, así que se reparten en bloques
+    entre los procesos. Los resultados se devuelven en el mismo orden que las
+    entradas, igual que ``map``. Con ``serial=True`` (o FIRE_SERIAL=1) todo se
+    ejecuta en el proceso actual, útil para depurar.
+    """
+    
+    def __init__(self, max_workers=None, chunksize=None, serial=False):
+        self.max_workers = max_workers or available_cpus()
+        self.chunksize = chunksize
+        self.serial = serial
+    
+    def map(self, funcion, *argumentos, desc=None):
+        argumentos = [list(a) for a in argumentos]
+        total = len(argumentos[0]) if argumentos else 0
+        
+        if self.serial or self.max_workers <= 1 or total < 2:
+            return list(tqdm(map(funcion, *argumentos), total=total, desc=desc))
+        
+        workers = min(self.max_workers, total)
+        chunksize = self.chunksize or max(1, total // (workers * 4))
+        
+        # spawn evita heredar locks de los hilos del servidor al hacer fork
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as executor:
+            resultados = executor.map(funcion, *argumentos, chunksize=chunksize)
+            return list(tqdm(resultados, total=total, desc=desc))
@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fire_processor import FireProcessor
-from scheduler import scheduler_instance
+from fire_service import fire_cache, fire_snapshot, jobs, submit_fire_job, fire_processing, load_fire_cache
+from scheduler import scheduler_instance, schedule_fire_task
 import time
+import asyncio
+import threading
 from datetime import datetime
 
 app = FastAPI()
@@ -15,48 +17,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-fire_cache = {
-    "data": None,
-    "timestamp": None,
-    "processing": False
-}
-
 @app.on_event("startup")
 async def startup_event():
+    threading.Thread(target=load_fire_cache, daemon=True).start()
+    schedule_fire_task()
     scheduler_instance.start_in_background()
     print("Fire scheduler started")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler_instance.stop()
+    jobs.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "API Procesamiento de Incendios", "status": "ok"}
 
 @app.post("/process-fires")
 async def process_fires():
-    if fire_cache["processing"]:
+    job, created = await asyncio.to_thread(submit_fire_job)
+
+    if job is None:
         return {
             "success": False,
-            "message": "Ya se está procesando incendios. Espera unos minutos.",
+            "message": "Ya se está procesando incendios en otro worker. Espera unos minutos.",
             "processing": True
         }
+
+    if not created:
+        return {
+            "success": False,
+            "message": "Ya se está procesando incendios. Espera unos minutos.",
+            "processing": True,
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}"
+        }
     
-    fire_cache["processing"] = True
-    
-    try:
-        processor = FireProcessor()
-        result = processor.process_all()
-        
-        fire_cache["data"] = result
-        fire_cache["timestamp"] = time.time()
-        fire_cache["processing"] = False
-        
-        return result
-        
-    except Exception as e:
-        fire_cache["processing"] = False
-        return {"success": False, "error": str(e)}
+    return {
+        "success": True,
+        "message": "Procesamiento de incendios iniciado",
+        "processing": True,
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}"
+    }
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.to_dict(include_result=False) for job in jobs.list()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    datos = await asyncio.to_thread(jobs.status, job_id)
+    if datos is None:
+        return {"success": False, "error": "Trabajo no encontrado", "job_id": job_id}
+    return {"success": True, **datos}
 
 @app.get("/fires-cache")
 async def get_fires_cache():
+    """Resultado de la última ejecución.
+
+    Con ``stats.alcance == "incremental"`` las cifras cubren solo los eventos
+    re-agrupados en esa ejecución; ``stats.almacen`` trae el total de
+    detecciones y eventos dentro de la ventana de retención.
+    """
+    await asyncio.to_thread(fire_snapshot.sync)
     if fire_cache["data"] and fire_cache["timestamp"]:
         age_minutes = (time.time() - fire_cache["timestamp"]) / 60
         return {
@@ -74,19 +98,21 @@ async def get_fires_cache():
 
 @app.get("/fires-status")
 async def fires_status():
+    await asyncio.to_thread(fire_snapshot.sync)
+    processing = await asyncio.to_thread(fire_processing)
     if fire_cache["timestamp"]:
         age_minutes = (time.time() - fire_cache["timestamp"]) / 60
         return {
             "cache_available": bool(fire_cache["data"]),
             "cache_age_minutes": round(age_minutes, 1),
-            "processing": fire_cache["processing"],
+            "processing": processing,
             "last_update": datetime.fromtimestamp(fire_cache["timestamp"]).strftime("%Y-%m-%d %H:%M:%S") if fire_cache["timestamp"] else None,
             "stats": fire_cache["data"].get("stats") if fire_cache["data"] else None
         }
     else:
         return {
             "cache_available": False,
-            "processing": fire_cache["processing"],
+            "processing": processing,
             "message": "No hay procesamiento previo"
         }
 
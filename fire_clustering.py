@@ -0,0 +1,109 @@
+import numpy as np
+from itertools import chain
+from scipy.spatial import cKDTree
+
+DIA_NS = 86_400 * 10**9
+
+
+class EventClusterer:
+    """Clustering espacial-temporal de detecciones con un KD-tree por día.
+
+    Reproduce exactamente la regla de FireProcessor: un punto se une al evento
+    de otro si ocurre entre 0 y ``time_lag`` días después y está a una distancia
+    menor o igual a ``distance_threshold`` (metros, EPSG:32717). Las semillas se
+    recorren en el orden de entrada, así que los evento_id son los mismos que
+    producía el flood fill original.
+    """
+
+    def __init__(self, distance_threshold=1000, time_lag=3):
+        self.distance_threshold = distance_threshold
+        self.time_lag = time_lag
+
+    def fit(self, x, y, fechas):
+        """Devuelve un array con el evento_id (1..k) de cada punto"""
+        coords = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+        tiempos = np.asarray(fechas, dtype='datetime64[ns]').astype(np.int64)
+        n = len(coords)
+        etiquetas = np.zeros(n, dtype=np.int64)
+
+        if n == 0:
+            return etiquetas
+
+        dias = np.floor_divide(tiempos, DIA_NS)
+
+        # Con hora distinta de 00:00 la diferencia en días (floor) puede caer
+        # un día más allá del bucket, así que se consulta uno adicional
+        con_hora = bool((tiempos - dias * DIA_NS).any())
+        alcance = self.time_lag + (1 if con_hora else 0)
+
+        indices = self._indexar_por_dia(coords, dias)
+        radio = self.distance_threshold * (1 + 1e-9)
+
+        evento_id = 0
+        for semilla in range(n):
+            if etiquetas[semilla]:
+                continue
+
+            evento_id += 1
+            etiquetas[semilla] = evento_id
+            frontera = np.array([semilla])
+
+            while frontera.size:
+                nuevos = self._expandir(frontera, coords, tiempos, dias, etiquetas,
+                                        indices, alcance, radio)
+                etiquetas[nuevos] = evento_id
+                frontera = nuevos
+
+        return etiquetas
+
+    def _indexar_por_dia(self, coords, dias):
+        orden = np.argsort(dias, kind='stable')
+        dias_unicos, inicios = np.unique(dias[orden], return_index=True)
+        grupos = np.split(orden, inicios[1:])
+
+        return {
+            int(dia): (idx, cKDTree(coords[idx]))
+            for dia, idx in zip(dias_unicos, grupos)
+        }
+
+    def _expandir(self, frontera, coords, tiempos, dias, etiquetas, indices, alcance, radio):
+        """Puntos sin clasificar alcanzables desde la frontera en un paso"""
+        candidatos = []
+        bases = []
+
+        for dia in np.unique(dias[frontera]):
+            base = frontera[dias[frontera] == dia]
+
+            for k in range(alcance + 1):
+                bucket = indices.get(int(dia) + k)
+                if bucket is None:
+                    continue
+
+                idx_dia, arbol = bucket
+                vecinos = arbol.query_ball_point(coords[base], radio)
+                tamanos = [len(v) for v in vecinos]
+
+                if not any(tamanos):
+                    continue
+
+                candidatos.append(idx_dia[np.fromiter(chain.from_iterable(vecinos), dtype=np.intp)])
+                bases.append(np.repeat(base, tamanos))
+
+        if not candidatos:
+            return np.empty(0, dtype=np.intp)
+
+        candidatos = np.concatenate(candidatos)
+        bases = np.concatenate(bases)
+
+        libres = etiquetas[candidatos] == 0
+        candidatos = candidatos[libres]
+        bases = bases[libres]
+
+        # Mismo criterio que la versión con GeoPandas: .dt.days y distancia euclidiana
+        diferencia = np.floor_divide(tiempos[candidatos] - tiempos[bases], DIA_NS)
+        dx = coords[candidatos, 0] - coords[bases, 0]
+        dy = coords[candidatos, 1] - coords[bases, 1]
+        validos = ((diferencia >= 0) & (diferencia <= self.time_lag) &
+                   (np.sqrt(dx * dx + dy * dy) <= self.distance_threshold))
+
+        return np.unique(candidatos[validos])
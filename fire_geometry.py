@@ -0,0 +1,168 @@
+import numpy as np
+import shapely
+from shapely.geometry import Point
+from shapely.ops import unary_union
+from scipy.spatial import Delaunay
+
+# Funciones geométricas de FireProcessor. Son de nivel de módulo y reciben
+# arreglos simples para poder ejecutarse en un pool de procesos.
+
+
+def event_polygons(puntos, fechas, max_edge_length=2000, max_triangle_area_ha=500):
+    """Polígono acumulado de cada día de un evento.
+    
+    ``puntos`` es un arreglo (n, 2) ordenado por ``fechas``. La triangulación
+    crece día a día con ``add_points`` y solo los triángulos que no existían
+    el día anterior se filtran y se unen al polígono previo, así que el costo
+    depende del número de puntos y no de puntos × días.
+    """
+    resultados = []
+    n_puntos = len(puntos)
+    dias, inicios = np.unique(fechas, return_index=True)
+    fines = np.append(inicios[1:], n_puntos)
+    
+    tri = None
+    codigos_anteriores = np.empty(0, dtype=np.int64)
+    poligono_anterior = None
+    
+    for fecha_actual, fin in zip(dias, fines):
+        acumulados = puntos[:fin]
+        
+        if fin >= 3:
+            try:
+                tri, simplices = _extend_triangulation(tri, acumulados)
+                
+                # Cada triángulo se identifica por sus vértices ordenados
+                vertices = np.sort(simplices, axis=1).astype(np.int64)
+                codigos = (vertices[:, 0] * n_puntos + vertices[:, 1]) * n_puntos + vertices[:, 2]
+                nuevos = ~np.isin(codigos, codigos_anteriores)
+                codigos_anteriores = codigos
+                
+                triangulos = filter_triangles(acumulados, simplices[nuevos],
+                                              max_edge_length, max_triangle_area_ha)
+                
+                if len(triangulos):
+                    poligono_actual = shapely.union_all(triangulos)
+                    
+                    if poligono_anterior is not None:
+                        poligono_actual = unary_union([poligono_actual, poligono_anterior])
+                    
+                    poligono_anterior = poligono_actual
+                else:
+                    poligono_actual = poligono_anterior
+                    
+            except Exception:
+                # Ni desde cero se pudo triangular (puntos alineados, por ejemplo)
+                tri = None
+                poligono_actual = poligono_anterior
+                
+        elif fin == 2:
+            poligono_actual = shapely.MultiPoint(acumulados).convex_hull
+        else:
+            poligono_actual = Point(acumulados[0])
+        
+        resultados.append((fecha_actual, poligono_actual))
+    
+    return resultados
+
+
+def _extend_triangulation(tri, acumulados):
+    """Triángulos de ``acumulados`` y la triangulación que se extiende al día siguiente.
+    
+    Si qhull no puede iniciar o extender el modo incremental (puntos duplicados
+    o cocirculares entre los primeros, por ejemplo) se triangula desde cero y se
+    devuelve None para que el día siguiente lo vuelva a intentar.
+    """
+    # En modo incremental qhull no reescala (Qbb), así que con coordenadas UTM
+    # pierde precisión: se triangula respecto al primer punto del evento
+    locales = acumulados - acumulados[0]
+    
+    # qhull necesita al menos 4 puntos para iniciar el modo incremental
+    if len(locales) < 4:
+        return None, Delaunay(locales).simplices
+    
+    if tri is not None:
+        try:
+            tri.add_points(locales[tri.npoints:])
+            return tri, tri.simplices
+        except Exception:
+            pass
+    
+    try:
+        tri = Delaunay(locales, incremental=True)
+        return tri, tri.simplices
+    except Exception:
+        return None, Delaunay(locales).simplices
+
+
+def filter_triangles(puntos, simplices, max_edge_length=2000, max_triangle_area_ha=500):
+    """Triángulos Delaunay con lado máximo <= max_edge_length y área <= max_triangle_area_ha.
+    
+    Los filtros se evalúan sobre el arreglo de vértices y solo los triángulos
+    válidos se convierten en polígonos.
+    """
+    vertices = puntos[simplices]
+    a, b, c = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+    
+    lados = vertices - vertices[:, [1, 2, 0]]
+    max_lado = np.sqrt((lados ** 2).sum(axis=2)).max(axis=1)
+    
+    # Misma fórmula que GEOS para el área de un anillo a-b-c-a
+    area_ha = np.abs((b[:, 0] - a[:, 0]) * (a[:, 1] - c[:, 1]) +
+                     (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])) / 2 / 10000
+    
+    validos = (max_lado <= max_edge_length) & (area_ha <= max_triangle_area_ha)
+    anillos = np.concatenate([vertices[validos], vertices[validos, :1]], axis=1)
+    return shapely.polygons(anillos)
+
+
+def new_burned_areas(actuales, anteriores):
+    """Área nueva de cada polígono diario respecto al polígono acumulado anterior.
+    
+    Ambos arreglos son de geometrías alineadas. Se resuelve en una sola llamada
+    vectorizada; si GEOS falla en alguna geometría se repite fila por fila y
+    las que no se pueden calcular quedan como None.
+    """
+    try:
+        return shapely.difference(actuales, anteriores)
+    except shapely.errors.GEOSException:
+        resultados = []
+        for actual, anterior in zip(actuales, anteriores):
+            try:
+                resultados.append(actual.difference(anterior))
+            except Exception:
+                resultados.append(None)
+        return np.array(resultados, dtype=object)
+
+
+FORMATOS_GEOMETRIA = ('wkt', 'wkb', 'ewkb')
+
+
+def encode_geometries(geometrias, formato='wkt', precision=6, srid=4326):
+    """Texto de cada geometría para subirla a PostGIS.
+    
+    - ``wkt``: WKT redondeado a ``precision`` decimales y sin ceros de relleno
+      (``precision=None`` conserva la precisión completa).
+    - ``wkb``: WKB en hexadecimal.
+    - ``ewkb``: WKB extendido en hexadecimal, con el SRID incluido.
+    
+    Se codifican todas las geometrías en una sola llamada de shapely.
+    """
+    geometrias = np.asarray(geometrias, dtype=object)
+    
+    if formato == 'wkt':
+        return shapely.to_wkt(geometrias, rounding_precision=-1 if precision is None else precision, trim=True)
+    if formato == 'wkb':
+        return shapely.to_wkb(geometrias, hex=True)
+    if formato == 'ewkb':
+        return shapely.to_wkb(shapely.set_srid(geometrias, srid), hex=True, include_srid=True)
+    
+    raise ValueError(f"Formato de geometría no soportado: {formato} (use {', '.join(FORMATOS_GEOMETRIA)})")
+
+
+def simplify_geometries(geometrias, tolerancia):
+    """Simplificación que preserva la topología (tolerancia en unidades del CRS; 0 = sin cambios)"""
+    geometrias = np.asarray(geometrias, dtype=object)
+    if not tolerancia:
+        return geometrias
+    return shapely.simplify(geometrias, tolerancia, preserve_topology=True)
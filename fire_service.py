@@ -0,0 +1,54 @@
+import time
+from fire_processor import FireProcessor, ETAPAS
+from job_manager import JobManager
+from persistent_cache import make_backend
+from shared_state import LeaseLock, SharedSnapshot
+
+# Estado del procesamiento de incendios compartido por main.py y fire_api.py.
+# El cache vive en memoria en cada worker y se sincroniza con el almacén
+# compartido; el lease garantiza una sola ejecución del pipeline entre todos
+# los workers y procesos que usan el mismo volumen.
+
+FIRES_TTL = 2 * 24 * 3600
+
+fire_cache = {"data": None, "timestamp": None}
+cache_store = make_backend()
+fire_snapshot = SharedSnapshot(cache_store, "fires", fire_cache, "data", FIRES_TTL)
+fire_lease = LeaseLock("process-fires", ttl=300)
+
+# Los procesamientos corren en hilos aparte; un solo trabajo por clave a la vez
+# (incendios y, en main.py, la actualización del ISC)
+# El estado de cada trabajo se publica en cache_store para consultarlo desde cualquier worker
+jobs = JobManager(max_workers=2, store=cache_store)
+
+
+def run_fire_job(job):
+    with fire_lease.hold() as propio:
+        if not propio:
+            return {"success": False, "error": "Otro worker ya está procesando incendios"}
+
+        result = FireProcessor().process_all(progress=job.report)
+        # Un error o una ejecución sin nada nuevo no reemplazan el último resultado
+        if result.get("success") and not result.get("skipped"):
+            fire_cache["data"] = result
+            fire_cache["timestamp"] = time.time()
+            fire_snapshot.save()
+        return result
+
+
+def submit_fire_job():
+    """Lanza el procesamiento; devuelve (job, creado). job es None si corre en otro worker"""
+    activo = jobs.active("process-fires")
+    if activo is None and fire_lease.active():
+        return None, False
+    return jobs.submit("process-fires", run_fire_job, etapas=ETAPAS)
+
+
+def fire_processing():
+    """Si hay un procesamiento en curso en este o en otro worker"""
+    return jobs.active("process-fires") is not None or fire_lease.active()
+
+
+def load_fire_cache():
+    if fire_snapshot.sync(forzar=True):
+        print("♻️ Cache de incendios restaurado")
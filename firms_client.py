@@ -0,0 +1,100 @@
+import time
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from pandas.errors import EmptyDataError
+
+
+class FirmsClient:
+    """Cliente HTTP para la API de área de NASA FIRMS.
+
+    Comparte una sesión con pool de conexiones keep-alive entre todas las
+    fuentes y las descarga en paralelo, de modo que la etapa de descarga tarda
+    lo que la fuente más lenta. Cada fuente tiene sus propios reintentos con
+    backoff exponencial: si una falla, las demás no esperan por ella.
+    """
+
+    def __init__(self, main_url, map_key, area_coords, day_range,
+                 timeout=30, max_retries=3, backoff_factor=1.0, max_workers=4):
+        self.main_url = main_url.rstrip('/')
+        self.map_key = map_key
+        self.area_coords = area_coords
+        self.day_range = day_range
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_workers = max_workers
+        self.session = self._crear_sesion()
+
+    def _crear_sesion(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def build_url(self, source, date, day_range=None):
+        area = ",".join(map(str, self.area_coords))
+        date_str = date.strftime("%Y-%m-%d")
+        return f"{self.main_url}/{self.map_key}/{source}/{area}/{day_range or self.day_range}/{date_str}"
+
+    def fetch(self, source, date, day_range=None, strict=False):
+        """Descarga el CSV de una fuente como DataFrame (vacío si falla, o la excepción con ``strict``)"""
+        url = self.build_url(source, date, day_range)
+
+        for intento in range(self.max_retries + 1):
+            try:
+                return self._leer_csv(url)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except requests.HTTPError as e:
+                # Solo vale la pena reintentar límites de tasa y errores del servidor
+                if e.response is None or (e.response.status_code != 429 and e.response.status_code < 500):
+                    if strict:
+                        raise
+                    print(f"Error descargando {source}: {e}")
+                    return pd.DataFrame()
+                error = e
+            except Exception as e:
+                if strict:
+                    raise
+                print(f"Error descargando {source}: {e}")
+                return pd.DataFrame()
+
+            if intento < self.max_retries:
+                espera = self.backoff_factor * (2 ** intento)
+                print(f"⚠️ {source}: {error} - reintento {intento + 1}/{self.max_retries} en {espera:.1f}s")
+                time.sleep(espera)
+
+        if strict:
+            raise error
+        print(f"Error descargando {source}: {error}")
+        return pd.DataFrame()
+
+    def _leer_csv(self, url):
+        # El cuerpo se pasa directamente al parser de pandas sin cargarlo en memoria
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+
+            try:
+                df = pd.read_csv(response.raw)
+            except EmptyDataError:
+                return pd.DataFrame()
+
+        # FIRMS responde 200 con un texto plano cuando la clave o la consulta es
+        # inválida; al ser una sola línea pandas lo lee como encabezado sin filas
+        if 'longitude' not in df.columns:
+            raise ValueError(f"Respuesta inesperada de FIRMS: {', '.join(map(str, df.columns))}")
+
+        return df
+
+    def fetch_all(self, sources, date, day_range=None, strict=False):
+        """Descarga todas las fuentes en paralelo; devuelve {fuente: DataFrame} en el orden dado"""
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(sources)) or 1) as executor:
+            futuros = {source: executor.submit(self.fetch, source, date, day_range, strict) for source in sources}
+            return {source: futuro.result() for source, futuro in futuros.items()}
+
+    def close(self):
+        self.session.close()
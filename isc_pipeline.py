@@ -0,0 +1,276 @@
+import os
+import ee
+from datetime import datetime, timezone
+from functools import lru_cache
+from climatology_store import ClimatologyStore
+
+# Índice de Sequedad Combinado (ISC) en Earth Engine.
+#
+# Cada etapa es una función memoizada por sus parámetros que devuelve el
+# objeto de EE (un nodo del grafo, que se evalúa en el servidor solo al pedir
+# el mapa). Así /indice-sequedad y /actualizar-sequedad comparten el mismo
+# grafo y en ejecuciones repetidas no se reconstruyen las etapas que no
+# cambiaron: el ROI de GAUL, el min/max histórico de NDVI, etc.
+
+FECHA_INICIO = '2024-01-01'
+FECHA_FIN = '2025-12-31'
+HISTORICO_NDVI = ('2020-01-01', '2024-12-31')
+
+# Rango de H100 cuando no se calcula sobre el país (o el cálculo no devuelve datos)
+H100_RANGO_FIJO = (10, 50)
+
+# Climatología NDVI precalculada (EE_ASSET_ROOT, p. ej. projects/<proyecto>/assets/isc).
+# Sin la variable, main.py usa los assets del proyecto de la cuenta de servicio;
+# con EE_ASSET_ROOT vacía se reduce en vivo en cada consulta
+climatologia = ClimatologyStore(os.getenv('EE_ASSET_ROOT'))
+
+SIMBOLOGIA = ['267E00', '56E200', 'FFFC00', 'FE7400', 'FF0000', '9E00FF']
+ETIQUETAS = [
+    'Muy baja (<50)',
+    'Baja (50-60)',
+    'Media (60-70)',
+    'Alta (70-80)',
+    'Muy alta (80-91)',
+    'Extrema (>91)'
+]
+VISUALIZACION = {'min': 1, 'max': 6, 'palette': SIMBOLOGIA, 'opacity': 0.70}
+
+# Colecciones de las que depende el ISC (el scheduler revisa si publicaron algo nuevo)
+COLECCIONES = ['NASA/GPM_L3/IMERG_V06', 'ECMWF/ERA5_LAND/DAILY_AGGR', 'MODIS/061/MOD13A2']
+
+FUENTES = {
+    "precipitation": "NASA GPM_L3/IMERG_V06",
+    "temperature": "ECMWF ERA5_LAND/DAILY_AGGR",
+    "ndvi": "MODIS/061/MOD13A2",
+    "boundaries": "FAO/GAUL/2015/level0"
+}
+
+
+@lru_cache(maxsize=None)
+def roi():
+    """Ecuador según los límites administrativos de GAUL"""
+    return ee.FeatureCollection("FAO/GAUL/2015/level0").filter(ee.Filter.eq("ADM0_NAME", "Ecuador"))
+
+
+@lru_cache(maxsize=None)
+def mascara():
+    return ee.Image(1).clip(roi()).mask()
+
+
+def cortar_coleccion(imagen):
+    return imagen.updateMask(mascara())
+
+
+@lru_cache(maxsize=8)
+def duracion_precipitacion(inicio=FECHA_INICIO, fin=FECHA_FIN, imagenes=48):
+    """Duración de la precipitación (GPM) en las últimas ``imagenes`` medias horas"""
+    gpm = ee.ImageCollection('NASA/GPM_L3/IMERG_V06') \
+        .select('precipitationCal') \
+        .filterBounds(roi()) \
+        .filterDate(inicio, fin) \
+        .sort('system:time_end', False) \
+        .limit(imagenes) \
+        .map(cortar_coleccion)
+    return gpm.sum().divide(2).rename('duracion')
+
+
+@lru_cache(maxsize=16)
+def era5_ultima(banda, inicio=FECHA_INICIO, fin=FECHA_FIN):
+    """Imagen diaria más reciente de ERA5-Land para una banda"""
+    return ee.ImageCollection('ECMWF/ERA5_LAND/DAILY_AGGR') \
+        .select(banda) \
+        .filterBounds(roi()) \
+        .map(cortar_coleccion) \
+        .filterDate(inicio, fin) \
+        .sort('system:time_end', False) \
+        .first()
+
+
+@lru_cache(maxsize=8)
+def humedad_y_temperatura(inicio=FECHA_INICIO, fin=FECHA_FIN):
+    """Humedad relativa (relahumi) y temperatura (temperature_2m) de ERA5"""
+    templast = era5_ultima('temperature_2m', inicio, fin)
+    dewpoint = era5_ultima('dewpoint_temperature_2m', inicio, fin)
+
+    temperaK = templast.subtract(273.15)
+    dewpointK = dewpoint.subtract(273.15)
+    pvse = dewpointK.multiply(17.27).divide(dewpointK.add(237.3)).exp().multiply(6.1078)
+    pvses = temperaK.multiply(17.27).divide(temperaK.add(237.3)).exp().multiply(6.1078)
+    relativehumidity = pvse.divide(pvses).multiply(100).rename('relahumi')
+
+    return relativehumidity.addBands(templast).clip(roi())
+
+
+@lru_cache(maxsize=8)
+def ndvi_ultimo(inicio=FECHA_INICIO, fin=FECHA_FIN):
+    """NDVI MODIS más reciente del periodo (escalado a -1..1)"""
+    coleccion = ee.ImageCollection("MODIS/061/MOD13A2") \
+        .select('NDVI') \
+        .filterDate(inicio, fin) \
+        .filterBounds(roi()) \
+        .map(cortar_coleccion)
+    return coleccion.sort('system:time_end', False).first().multiply(0.0001)
+
+
+def reducir_ndvi_historico(inicio=HISTORICO_NDVI[0], fin=HISTORICO_NDVI[1]):
+    """NDVI_min y NDVI_max por píxel (sin escalar) reduciendo la colección histórica"""
+    historico = ee.ImageCollection("MODIS/061/MOD13A2") \
+        .select('NDVI') \
+        .filterDate(inicio, fin) \
+        .filterBounds(roi()) \
+        .map(cortar_coleccion)
+    return historico.reduce(ee.Reducer.minMax())
+
+
+def climatologia_ndvi(historico=HISTORICO_NDVI):
+    """Asset con la climatología de la ventana si ya está listo (si no, None y se exporta)"""
+    return climatologia.ready_asset(
+        *historico,
+        exportar=lambda: (reducir_ndvi_historico(*historico), roi().geometry().bounds())
+    )
+
+
+@lru_cache(maxsize=4)
+def ndvi_min_max(inicio=HISTORICO_NDVI[0], fin=HISTORICO_NDVI[1], asset_id=None):
+    """NDVI mínimo y máximo por píxel en el periodo histórico (del asset si se indica)"""
+    stats = ee.Image(asset_id) if asset_id else reducir_ndvi_historico(inicio, fin)
+    return stats.select('NDVI_min').multiply(0.0001), stats.select('NDVI_max').multiply(0.0001)
+
+
+@lru_cache(maxsize=8)
+def h100(inicio=FECHA_INICIO, fin=FECHA_FIN):
+    """Humedad del combustible muerto de 100 horas a partir de EMC y la precipitación"""
+    datos = humedad_y_temperatura(inicio, fin)
+
+    EMC = datos.expression(
+        "(b('relahumi') < 10) ? 0.032229+0.281073*b('relahumi')-0.000578*b('relahumi')*b('temperature_2m')" +
+        ": (b('relahumi') < 50) ? 2.22749+0.160107*b('relahumi')-0.014784*b('temperature_2m')" +
+        ": 21.0606+0.005565*(b('relahumi')**2)-0.00035*b('relahumi')*b('temperature_2m')-0.483199*b('relahumi')"
+    ).rename('EMC')
+
+    h100inputs = EMC.addBands(duracion_precipitacion(inicio, fin)).clip(roi())
+    return h100inputs.expression(
+        "(24 - b('duracion')) * b('EMC') + b('duracion') * (0.5 * b('duracion') + 41)"
+    ).divide(24).rename('H100')
+
+
+@lru_cache(maxsize=8)
+def lr(inicio=FECHA_INICIO, fin=FECHA_FIN, historico=HISTORICO_NDVI, climatologia_asset=None):
+    """Humedad del combustible vivo (LR) a partir del verdor relativo (RG)"""
+    minNDVI, maxNDVI = ndvi_min_max(*historico, climatologia_asset)
+    ndvilast = ndvi_ultimo(inicio, fin)
+
+    imagenLRmax = maxNDVI.expression(
+        '0.30 + 0.30 * ((NDVImax + 0.19) / (0.95 + 0.19))', {
+            'NDVImax': maxNDVI
+        }
+    ).rename('LRmax')
+
+    imagenRG = ndvilast.expression(
+        '((NDVI - NDVImin) / (NDVImax - NDVImin)) * 100', {
+            'NDVI': ndvilast.select('NDVI'),
+            'NDVImin': minNDVI,
+            'NDVImax': maxNDVI
+        }
+    ).rename('RG')
+
+    return imagenRG.expression(
+        'RG * LRmax / 100', {
+            'RG': imagenRG,
+            'LRmax': imagenLRmax
+        }
+    ).rename('LR')
+
+
+@lru_cache(maxsize=8)
+def rango_h100(inicio=FECHA_INICIO, fin=FECHA_FIN, escala=1000):
+    """Mínimo y máximo de H100 en el país como ee.Number (H100_RANGO_FIJO si no hay datos).
+
+    No hay getInfo: las estadísticas se resuelven en el servidor junto con el
+    mapa, sin viajes de ida y vuelta adicionales.
+    """
+    h100Stats = h100(inicio, fin).reduceRegion(
+        reducer=ee.Reducer.minMax(),
+        geometry=roi(),
+        scale=escala,
+        maxPixels=1e9
+    )
+
+    def valor(clave, defecto):
+        # If trata null y 0 como falso, igual que el `or` del cálculo en el cliente
+        numero = h100Stats.get(clave)
+        return ee.Number(ee.Algorithms.If(numero, numero, defecto))
+
+    return valor('H100_min', H100_RANGO_FIJO[0]), valor('H100_max', H100_RANGO_FIJO[1])
+
+
+def mr(inicio=FECHA_INICIO, fin=FECHA_FIN, rango=None, escala=1000):
+    """Humedad relativa del combustible muerto (MR), H100 normalizado.
+
+    ``rango`` fija (H100min, H100max); si es None se calcula sobre el país a
+    la ``escala`` indicada.
+    """
+    H100min, H100max = rango or rango_h100(inicio, fin, escala)
+    imagen = h100(inicio, fin)
+
+    return imagen.expression(
+        '((H100 - H100min) / (H100max - H100min))', {
+            'H100': imagen,
+            'H100min': ee.Image.constant(H100min),
+            'H100max': ee.Image.constant(H100max)
+        }
+    ).rename('MR')
+
+
+def fdi(inicio=FECHA_INICIO, fin=FECHA_FIN, rango=None, escala=1000, historico=HISTORICO_NDVI):
+    """Clases 1..6 del índice de peligro (FDI) recortadas a Ecuador"""
+    imagenLR = lr(inicio, fin, historico, climatologia_ndvi(historico))
+    imagenMR = mr(inicio, fin, rango, escala)
+
+    imagenFDIsc = imagenLR.expression(
+        '((1 - LR) * (1 - MR)) * 100', {
+            'LR': imagenLR,
+            'MR': imagenMR
+        }
+    ).rename('FDI')
+
+    return ee.Image(0) \
+        .where(imagenFDIsc.lt(50), 1) \
+        .where(imagenFDIsc.gte(50).And(imagenFDIsc.lt(60)), 2) \
+        .where(imagenFDIsc.gte(60).And(imagenFDIsc.lt(70)), 3) \
+        .where(imagenFDIsc.gte(70).And(imagenFDIsc.lt(80)), 4) \
+        .where(imagenFDIsc.gte(80).And(imagenFDIsc.lt(91)), 5) \
+        .where(imagenFDIsc.gte(91), 6).clip(roi())
+
+
+def map_tiles(inicio=FECHA_INICIO, fin=FECHA_FIN, rango=None, escala=1000, historico=HISTORICO_NDVI):
+    """Genera el mapa del ISC en EE; devuelve tile_url, mapid, token y leyenda"""
+    map_id = fdi(inicio, fin, rango, escala, historico).getMapId(VISUALIZACION)
+
+    return {
+        "tile_url": map_id['tile_fetcher'].url_format,
+        "mapid": map_id['mapid'],
+        "token": map_id['token'],
+        "legend": {
+            "title": "Nivel de Sequedad",
+            "labels": ETIQUETAS,
+            "colors": SIMBOLOGIA
+        }
+    }
+
+
+def ultimas_publicaciones(colecciones=tuple(COLECCIONES), dias=60):
+    """``system:time_end`` más reciente de cada colección en los últimos ``dias`` (una sola llamada)"""
+    fin = ee.Date(datetime.now(timezone.utc).strftime('%Y-%m-%d')).advance(1, 'day')
+    inicio = fin.advance(-dias, 'day')
+    return ee.Dictionary({
+        coleccion: ee.ImageCollection(coleccion).filterDate(inicio, fin).aggregate_max('system:time_end')
+        for coleccion in colecciones
+    }).getInfo()
+
+
+def clear_cache():
+    """Descarta las etapas memoizadas (p. ej. tras reinicializar EE)"""
+    for etapa in (roi, mascara, duracion_precipitacion, era5_ultima, humedad_y_temperatura,
+                  ndvi_ultimo, ndvi_min_max, h100, lr, rango_h100):
+        etapa.cache_clear()
@@ -0,0 +1,194 @@
+import time
+import uuid
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+def _fecha(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else None
+
+
+class Job:
+    """Un trabajo en segundo plano con su estado y el avance por etapa"""
+
+    def __init__(self, nombre, etapas=None):
+        self.id = uuid.uuid4().hex
+        self.nombre = nombre
+        self.status = 'queued'
+        self.etapas = OrderedDict((etapa, {'status': 'pending'}) for etapa in (etapas or []))
+        self.etapa_actual = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.on_change = None
+        self._lock = threading.Lock()
+
+    def _notificar(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'error')
+
+    def report(self, etapa):
+        """Marca el inicio de una etapa (y el fin de la anterior)"""
+        ahora = time.time()
+        with self._lock:
+            self._cerrar_etapa(ahora, 'done')
+            info = self.etapas.setdefault(etapa, {})
+            info.update(status='running', started_at=ahora)
+            self.etapa_actual = etapa
+        self._notificar()
+
+    def _cerrar_etapa(self, ahora, status):
+        if self.etapa_actual is None:
+            return
+        info = self.etapas[self.etapa_actual]
+        info.update(status=status, seconds=round(ahora - info['started_at'], 2))
+        self.etapa_actual = None
+
+    def _iniciar(self):
+        with self._lock:
+            self.status = 'running'
+            self.started_at = time.time()
+        self._notificar()
+
+    def _terminar(self, result=None, error=None):
+        ahora = time.time()
+        with self._lock:
+            self._cerrar_etapa(ahora, 'error' if error else 'done')
+            self.result = result
+            self.error = error
+            self.status = 'error' if error else 'done'
+            self.finished_at = ahora
+        self._notificar()
+
+    @property
+    def progress(self):
+        if not self.etapas:
+            return 1.0 if self.finished else 0.0
+        completadas = sum(info['status'] == 'done' for info in self.etapas.values())
+        return round(completadas / len(self.etapas), 2)
+
+    def to_dict(self, include_result=True):
+        with self._lock:
+            fin = self.finished_at or time.time()
+            datos = {
+                "job_id": self.id,
+                "name": self.nombre,
+                "status": self.status,
+                "stage": self.etapa_actual,
+                "progress": self.progress,
+                "stages": [
+                    {"name": etapa, "status": info['status'], "seconds": info.get('seconds')}
+                    for etapa, info in self.etapas.items()
+                ],
+                "created_at": _fecha(self.created_at),
+                "started_at": _fecha(self.started_at),
+                "finished_at": _fecha(self.finished_at),
+                "elapsed_seconds": round(fin - self.started_at, 1) if self.started_at else None,
+                "error": self.error
+            }
+            if include_result:
+                datos["result"] = self.result
+            return datos
+
+
+class JobManager:
+    """Ejecuta trabajos largos en un pool de hilos sin bloquear el event loop.
+
+    ``submit`` devuelve el trabajo de inmediato. Los trabajos con la misma
+    clave son exclusivos: mientras uno está en cola o corriendo, volver a
+    enviarlo devuelve el existente en lugar de lanzar otro. Se conservan los
+    últimos ``max_history`` trabajos para consultar su estado. Con ``store``
+    (un backend de persistent_cache) cada cambio de estado se publica ahí
+    durante ``ttl`` segundos, para que ``status`` responda desde cualquier
+    worker.
+    """
+
+    def __init__(self, max_workers=1, max_history=50, store=None, ttl=24 * 3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.max_history = max_history
+        self.store = store
+        self.ttl = ttl
+        self._jobs = OrderedDict()
+        self._activos = {}
+        self._lock = threading.Lock()
+
+    def submit(self, nombre, funcion, clave=None, etapas=None):
+        """Encola ``funcion(job)``; devuelve (job, creado)"""
+        clave = clave or nombre
+
+        with self._lock:
+            activo = self._activos.get(clave)
+            if activo is not None and not activo.finished:
+                return activo, False
+
+            job = Job(nombre, etapas)
+            if self.store is not None:
+                job.on_change = self._publicar
+            self._activos[clave] = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+
+        self._publicar(job)
+        self.executor.submit(self._ejecutar, job, funcion, clave)
+        return job, True
+
+    def _publicar(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.set(f"job-{job.id}", job.to_dict(), self.ttl)
+        except Exception as e:
+            print(f"⚠️ No se publicó el estado del trabajo {job.id}: {e}")
+
+    def _ejecutar(self, job, funcion, clave):
+        job._iniciar()
+        try:
+            resultado = funcion(job)
+            # Un resultado {"success": False, ...} cuenta como fallo de la etapa en curso
+            error = None
+            if isinstance(resultado, dict) and resultado.get('success') is False:
+                error = resultado.get('error') or resultado.get('message') or 'Error'
+            job._terminar(result=resultado, error=error)
+        except Exception as e:
+            traceback.print_exc()
+            job._terminar(error=str(e))
+        finally:
+            with self._lock:
+                if self._activos.get(clave) is job:
+                    del self._activos[clave]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Estado del trabajo (dict), de este worker o publicado por otro; None si no existe"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is None:
+            return None
+        entrada = self.store.get(f"job-{job_id}")
+        return entrada['valor'] if entrada else None
+
+    def active(self, clave):
+        """Trabajo en cola o corriendo para esa clave (None si no hay)"""
+        with self._lock:
+            return self._activos.get(clave)
+
+    def list(self):
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
@@ -1,8 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 import ee
 import os
 import json
+import threading
+from ee_executor import EEExecutor
+import isc_pipeline
+from tile_renderer import TileRenderer, download_classes
+from response_cache import SingleFlight, TTLCache, request_key
+from persistent_cache import make_backend
+from shared_state import LeaseLock, SharedSnapshot
 
 app = FastAPI()
 
@@ -27,341 +34,260 @@ def init_ee():
             key_data=creds
         )
         ee.Initialize(credentials)
+        
+        # Sin EE_ASSET_ROOT la climatología NDVI se exporta a los assets del proyecto
+        if os.getenv('EE_ASSET_ROOT') is None and creds_dict.get('project_id'):
+            isc_pipeline.climatologia.configure(f"projects/{creds_dict['project_id']}/assets")
         return True
     except Exception as e:
         print(f"Error inicializando EE: {e}")
         return False
 
+# Las llamadas a Earth Engine bloquean: se ejecutan en un pool acotado fuera del event loop
+EE_TIMEOUT = int(os.getenv('EE_TIMEOUT', '120'))
+EE_SLOW_TIMEOUT = int(os.getenv('EE_SLOW_TIMEOUT', '600'))
+ee_executor = EEExecutor(
+    max_workers=int(os.getenv('EE_MAX_WORKERS', '4')),
+    max_pending=int(os.getenv('EE_MAX_PENDING', '16')),
+    timeout=EE_TIMEOUT
+)
+
+async def run_ee(funcion, timeout=None):
+    """Ejecuta una función de EE en el pool; si EE no está inicializado, lo inicializa y reintenta"""
+    try:
+        return await ee_executor.run(funcion, timeout=timeout)
+    except Exception as e:
+        if "not initialized" in str(e).lower() and await ee_executor.run(init_ee):
+            isc_pipeline.clear_cache()
+            return await ee_executor.run(funcion, timeout=timeout)
+        raise
+
+def run_ee_sync(funcion, *args, timeout=None):
+    """Como run_ee, para hilos fuera del event loop (trabajos en segundo plano)"""
+    try:
+        return ee_executor.run_sync(funcion, *args, timeout=timeout)
+    except Exception as e:
+        if "not initialized" in str(e).lower() and ee_executor.run_sync(init_ee):
+            isc_pipeline.clear_cache()
+            return ee_executor.run_sync(funcion, *args, timeout=timeout)
+        raise
+
+# Consultas idénticas simultáneas comparten una sola evaluación en EE
+single_flight = SingleFlight()
+
+async def run_ee_shared(endpoint, funcion, params=None, timeout=None):
+    """run_ee agrupando por endpoint y parámetros las consultas que llegan a la vez"""
+    return await single_flight.do(request_key(endpoint, params), lambda: run_ee(funcion, timeout=timeout))
+
+# Caché de respuestas de EE. MOD13A2 publica un compuesto cada 16 días, pero
+# los mapid de getMapId caducan antes: la capa se cachea dentro de su vigencia
+MODIS_NDVI_INTERVAL = 16 * 24 * 3600
+EE_MAPID_TTL = int(os.getenv('EE_MAPID_TTL', str(4 * 3600)))
+NDVI_MAP_STALE = 30 * 60
+NDVI_MAP_TTL = min(MODIS_NDVI_INTERVAL, EE_MAPID_TTL) - NDVI_MAP_STALE
+response_cache = TTLCache(max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '128')), single_flight=single_flight)
+
+async def cached_ee(endpoint, funcion, ttl, stale_ttl=0, params=None, timeout=None):
+    """run_ee_shared con caché TTL: sirve la copia vieja mientras se refresca"""
+    return await response_cache.get_or_compute(
+        request_key(endpoint, params), lambda: run_ee(funcion, timeout=timeout), ttl, stale_ttl
+    )
+
+# Copia compartida de cache_data entre workers y reinicios (CACHE_BACKEND, SQLite por omisión)
+cache_store = make_backend()
+SEQUEDAD_TTL = 3 * 24 * 3600
+
+def _cargar_caches():
+    tiles.load()
+    if sync_sequedad(forzar=True):
+        print("♻️ Cache de sequedad restaurado")
+    load_fire_cache()
+
+# Todo lo que carga datos, inicializa EE o programa tareas va en el arranque y
+# no al importar: los procesos del pool de EventExecutor (spawn) reimportan este
+# módulo como __mp_main__ y no deben repetirlo
 @app.on_event("startup")
 async def startup_event():
-    success = init_ee()
+    # Los caches se restauran en segundo plano; el API atiende mientras tanto
+    threading.Thread(target=_cargar_caches, daemon=True).start()
+    success = await ee_executor.run(init_ee)
     print(f"EE Initialization: {'Success' if success else 'Failed'}")
+    if isc_pipeline.climatologia.enabled:
+        print(f"📦 Climatología NDVI precalculada en {isc_pipeline.climatologia.asset_root}")
+    else:
+        print("⚠️ Climatología NDVI sin assets (EE_ASSET_ROOT vacía o sin proyecto): se reduce en cada consulta")
+    schedule_fire_task()
+    schedule_sequedad_task()
+    scheduler_instance.start_in_background()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler_instance.stop()
+    jobs.shutdown()
+    ee_executor.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "API NDVI Ecuador", "status": "ok"}
 
+def _test_ee():
+    img = ee.Image(1)
+    info = img.getInfo()
+    return {"success": True, "message": "Earth Engine funcionando"}
+
 @app.get("/test-ee")
 async def test_ee():
     """Test básico de Earth Engine"""
     try:
-        img = ee.Image(1)
-        info = img.getInfo()
-        return {"success": True, "message": "Earth Engine funcionando"}
+        return await run_ee(_test_ee)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _ndvi_layer():
+    """Capa NDVI de Ecuador recortada con GAUL (llamadas bloqueantes a EE)"""
+    # Usar límite administrativo exacto de Ecuador (más preciso que rectángulo)
+    ecuador = ee.FeatureCollection("FAO/GAUL/2015/level0") \
+        .filter(ee.Filter.eq("ADM0_NAME", "Ecuador")) \
+        .geometry()
+
+    # Obtener NDVI más reciente de MODIS
+    ndvi_collection = ee.ImageCollection('MODIS/061/MOD13A2') \
+        .select('NDVI') \
+        .filterBounds(ecuador) \
+        .filterDate('2024-01-01', '2024-12-31') \
+        .sort('system:time_start', False)
+
+    # Tomar la imagen más reciente
+    ndvi_latest = ndvi_collection.first().multiply(0.0001)
+
+    # Recortar EXACTAMENTE a los límites de Ecuador
+    ndvi_ecuador = ndvi_latest.clip(ecuador)
+
+    # Aplicar máscara para mostrar solo Ecuador
+    ndvi_masked = ndvi_ecuador.updateMask(ndvi_ecuador.gte(-1))
+
+    # Generar visualización mejorada
+    vis_params = {
+        'min': 0,
+        'max': 1,
+        'palette': [
+            '#8B0000',  # Rojo oscuro (sin vegetación)
+            '#CD5C5C',  # Rojo claro
+            '#F0E68C',  # Amarillo (vegetación baja)
+            '#9ACD32',  # Verde amarillento
+            '#32CD32',  # Verde lima
+            '#228B22',  # Verde bosque
+            '#006400'   # Verde oscuro (vegetación densa)
+        ]
+    }
+
+    # Obtener URL de tiles
+    map_id = ndvi_masked.getMapId(vis_params)
+
+    return {
+        "success": True,
+        "tile_url": map_id['tile_fetcher'].url_format,
+        "mapid": map_id['mapid'],
+        "token": map_id['token'],
+        "message": "NDVI recortado exactamente para Ecuador",
+        "date_range": "2024-01-01 a 2024-12-31",
+        "description": "NDVI más reciente de MODIS recortado con límites administrativos de Ecuador",
+        "boundary_source": "FAO GAUL 2015"
+    }
+
 @app.get("/ndvi")
 async def get_ndvi():
     """Obtener capa NDVI de Ecuador (recortado exacto)"""
     try:
-        # Usar límite administrativo exacto de Ecuador (más preciso que rectángulo)
-        ecuador = ee.FeatureCollection("FAO/GAUL/2015/level0") \
-            .filter(ee.Filter.eq("ADM0_NAME", "Ecuador")) \
-            .geometry()
-        
-        # Obtener NDVI más reciente de MODIS
-        ndvi_collection = ee.ImageCollection('MODIS/061/MOD13A2') \
-            .select('NDVI') \
-            .filterBounds(ecuador) \
-            .filterDate('2024-01-01', '2024-12-31') \
-            .sort('system:time_start', False)
-        
-        # Tomar la imagen más reciente
-        ndvi_latest = ndvi_collection.first().multiply(0.0001)
-        
-        # Recortar EXACTAMENTE a los límites de Ecuador
-        ndvi_ecuador = ndvi_latest.clip(ecuador)
-        
-        # Aplicar máscara para mostrar solo Ecuador
-        ndvi_masked = ndvi_ecuador.updateMask(ndvi_ecuador.gte(-1))
-        
-        # Generar visualización mejorada
-        vis_params = {
-            'min': 0,
-            'max': 1,
-            'palette': [
-                '#8B0000',  # Rojo oscuro (sin vegetación)
-                '#CD5C5C',  # Rojo claro
-                '#F0E68C',  # Amarillo (vegetación baja)
-                '#9ACD32',  # Verde amarillento
-                '#32CD32',  # Verde lima
-                '#228B22',  # Verde bosque
-                '#006400'   # Verde oscuro (vegetación densa)
-            ]
-        }
-        
-        # Obtener URL de tiles
-        map_id = ndvi_masked.getMapId(vis_params)
-        
+        return await cached_ee("/ndvi", _ndvi_layer, NDVI_MAP_TTL, NDVI_MAP_STALE)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def _ndvi_info():
+    ecuador = ee.Geometry.Rectangle([-82, -5, -75, 2])
+
+    collection = ee.ImageCollection('MODIS/061/MOD13A2') \
+        .select('NDVI') \
+        .filterBounds(ecuador) \
+        .filterDate('2024-01-01', '2024-12-31')
+
+    # Obtener información de la colección
+    size = collection.size().getInfo()
+
+    if size > 0:
+        latest = collection.sort('system:time_start', False).first()
+        date_info = latest.get('system:time_start').getInfo()
+        date_readable = ee.Date(date_info).format('YYYY-MM-dd').getInfo()
+
         return {
             "success": True,
-            "tile_url": map_id['tile_fetcher'].url_format,
-            "mapid": map_id['mapid'],
-            "token": map_id['token'],
-            "message": "NDVI recortado exactamente para Ecuador",
-            "date_range": "2024-01-01 a 2024-12-31",
-            "description": "NDVI más reciente de MODIS recortado con límites administrativos de Ecuador",
-            "boundary_source": "FAO GAUL 2015"
+            "total_images": size,
+            "latest_date": date_readable,
+            "dataset": "MODIS/061/MOD13A2",
+            "spatial_resolution": "500m",
+            "temporal_resolution": "16 days"
         }
-        
-    except Exception as e:
-        # Si falla, intentar reinicializar
-        if "not initialized" in str(e).lower():
-            if init_ee():
-                return await get_ndvi()  # Reintentar
-        
-        return {"success": False, "error": str(e)}
+    else:
+        return {"success": False, "error": "No hay imágenes disponibles"}
 
 @app.get("/ndvi-info")
 async def get_ndvi_info():
     """Información sobre el dataset NDVI"""
     try:
-        ecuador = ee.Geometry.Rectangle([-82, -5, -75, 2])
-        
-        collection = ee.ImageCollection('MODIS/061/MOD13A2') \
-            .select('NDVI') \
-            .filterBounds(ecuador) \
-            .filterDate('2024-01-01', '2024-12-31')
-        
-        # Obtener información de la colección
-        size = collection.size().getInfo()
-        
-        if size > 0:
-            latest = collection.sort('system:time_start', False).first()
-            date_info = latest.get('system:time_start').getInfo()
-            date_readable = ee.Date(date_info).format('YYYY-MM-dd').getInfo()
-            
-            return {
-                "success": True,
-                "total_images": size,
-                "latest_date": date_readable,
-                "dataset": "MODIS/061/MOD13A2",
-                "spatial_resolution": "500m",
-                "temporal_resolution": "16 days"
-            }
-        else:
-            return {"success": False, "error": "No hay imágenes disponibles"}
-            
+        return await cached_ee("/ndvi-info", _ndvi_info, MODIS_NDVI_INTERVAL, 24 * 3600)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _indice_sequedad():
+    """Índice de Sequedad Combinado (ISC) - Tu algoritmo completo"""
+    # MR normalizado con el rango de H100 calculado sobre el país a 1000 m
+    mapa = isc_pipeline.map_tiles(escala=1000)
+
+    return {
+        "success": True,
+        **mapa,
+        "message": "Índice de Sequedad Combinado (ISC) generado exitosamente",
+        "algorithm": "Tu algoritmo original completo",
+        "date_range": f"{isc_pipeline.FECHA_INICIO} a {isc_pipeline.FECHA_FIN}",
+        "data_sources": isc_pipeline.FUENTES
+    }
+
 @app.get("/indice-sequedad")
 async def get_indice_sequedad():
     """Índice de Sequedad Combinado (ISC) - Tu algoritmo completo"""
     try:
-        # ROI de Ecuador usando límites administrativos
-        roi = ee.FeatureCollection("FAO/GAUL/2015/level0").filter(ee.Filter.eq("ADM0_NAME","Ecuador"))
-
-        # Fechas
-        fechaInicio = '2024-01-01'
-        fechaFin = '2025-12-31'
-        fecha = fechaFin
-
-        # Máscara de recorte
-        mascaracut = ee.Image(1).clip(roi)
-
-        def cortarcoleccion(imagen):
-            mascara = mascaracut.mask()
-            return imagen.updateMask(mascara)
-
-        # 1. PRECIPITACIÓN GPM
-        gpmColeccion = ee.ImageCollection('NASA/GPM_L3/IMERG_V06') \
-            .select('precipitationCal') \
-            .filterBounds(roi) \
-            .filterDate(fechaInicio, fechaFin) \
-            .sort('system:time_end', False) \
-            .limit(48) \
-            .map(cortarcoleccion)
-
-        # Duración de precipitación
-        umbral = 0.1
-        conprecipitacion = gpmColeccion.map(lambda image: image.gt(umbral))
-        duracionPrecipitacion = gpmColeccion.sum().divide(2).rename('duracion')
-
-        # 2. TEMPERATURA ERA5
-        templast = ee.ImageCollection('ECMWF/ERA5_LAND/DAILY_AGGR') \
-            .select('temperature_2m') \
-            .filterBounds(roi) \
-            .map(cortarcoleccion) \
-            .filterDate(fechaInicio, fechaFin) \
-            .sort('system:time_end', False) \
-            .first()
-
-        # 3. PUNTO DE ROCÍO
-        dewpoint = ee.ImageCollection('ECMWF/ERA5_LAND/DAILY_AGGR') \
-            .select('dewpoint_temperature_2m') \
-            .filterBounds(roi) \
-            .map(cortarcoleccion) \
-            .filterDate(fechaInicio, fechaFin) \
-            .sort('system:time_end', False) \
-            .first()
-
-        # 4. CÁLCULO HUMEDAD RELATIVA
-        temperaK = templast.subtract(273.15)
-        dewpointK = dewpoint.subtract(273.15)
-        pvse = dewpointK.multiply(17.27).divide(dewpointK.add(237.3)).exp().multiply(6.1078)
-        pvses = temperaK.multiply(17.27).divide(temperaK.add(237.3)).exp().multiply(6.1078)
-        relativehumidity = pvse.divide(pvses).multiply(100).rename('relahumi')
-
-        datos = relativehumidity.addBands(templast).clip(roi)
-
-        # 5. NDVI MODIS
-        coleccionNDVI = ee.ImageCollection("MODIS/061/MOD13A2") \
-            .select('NDVI') \
-            .filterDate(fechaInicio, fechaFin) \
-            .filterBounds(roi) \
-            .map(cortarcoleccion)
-
-        ndvilast = coleccionNDVI.sort('system:time_end', False).first().multiply(0.0001)
-
-        # 6. NDVI MIN/MAX - Usar datos históricos públicos en lugar de assets privados
-        # Calcular min/max de la colección histórica
-        ndviHistorico = ee.ImageCollection("MODIS/061/MOD13A2") \
-            .select('NDVI') \
-            .filterDate('2020-01-01', '2024-12-31') \
-            .filterBounds(roi) \
-            .map(cortarcoleccion)
-
-        ndviStats = ndviHistorico.reduce(ee.Reducer.minMax())
-        minNDVI = ndviStats.select('NDVI_min').multiply(0.0001)
-        maxNDVI = ndviStats.select('NDVI_max').multiply(0.0001)
-
-        # 7. EMC (Equilibrium Moisture Content)
-        EMC = datos.expression(
-            "(b('relahumi') < 10) ? 0.032229+0.281073*b('relahumi')-0.000578*b('relahumi')*b('temperature_2m')" +
-            ": (b('relahumi') < 50) ? 2.22749+0.160107*b('relahumi')-0.014784*b('temperature_2m')" +
-            ": 21.0606+0.005565*(b('relahumi')**2)-0.00035*b('relahumi')*b('temperature_2m')-0.483199*b('relahumi')"
-        ).rename('EMC')
-
-        # 8. H100
-        h100inputs = EMC.addBands(duracionPrecipitacion).clip(roi)
-        h100 = h100inputs.expression(
-            "(24 - b('duracion')) * b('EMC') + b('duracion') * (0.5 * b('duracion') + 41)"
-        ).divide(24).rename('H100')
-
-        # 9. LRmax
-        imagenLRmax = maxNDVI.expression(
-            '0.30 + 0.30 * ((NDVImax + 0.19) / (0.95 + 0.19))', {
-                'NDVImax': maxNDVI
-            }
-        ).rename('LRmax')
-
-        # 10. RG (Relative Greenness)
-        imagenRG = ndvilast.expression(
-            '((NDVI - NDVImin) / (NDVImax - NDVImin)) * 100', {
-                'NDVI': ndvilast.select('NDVI'),
-                'NDVImin': minNDVI,
-                'NDVImax': maxNDVI
-            }
-        ).rename('RG')
-
-        # 11. LR (Live Fuel Moisture)
-        imagenLR = imagenRG.expression(
-            'RG * LRmax / 100', {
-                'RG': imagenRG,
-                'LRmax': imagenLRmax
-            }
-        ).rename('LR')
-
-        # 12. MR - Usar estadísticas de H100 en lugar de assets privados
-        h100Stats = h100.reduceRegion(
-            reducer=ee.Reducer.minMax(),
-            geometry=roi,
-            scale=1000,
-            maxPixels=1e9
-        )
-        
-        # Valores aproximados para Ecuador (puedes ajustar)
-        H100min = ee.Image.constant(h100Stats.getNumber('H100_min').getInfo() if h100Stats.getNumber('H100_min').getInfo() else 10)
-        H100max = ee.Image.constant(h100Stats.getNumber('H100_max').getInfo() if h100Stats.getNumber('H100_max').getInfo() else 50)
-
-        imagenMR = h100.expression(
-            '((H100 - H100min) / (H100max - H100min))', {
-                'H100': h100,
-                'H100min': H100min,
-                'H100max': H100max
-            }
-        ).rename('MR')
-
-        # 13. FDI (Fire Danger Index)
-        imagenFDIsc = imagenLR.expression(
-            '((1 - LR) * (1 - MR)) * 100', {
-                'LR': imagenLR,
-                'MR': imagenMR
-            }
-        ).rename('FDI')
-
-        # 14. CLASIFICACIÓN FINAL
-        imagenFDI = ee.Image(0) \
-            .where(imagenFDIsc.lt(50), 1) \
-            .where(imagenFDIsc.gte(50).And(imagenFDIsc.lt(60)), 2) \
-            .where(imagenFDIsc.gte(60).And(imagenFDIsc.lt(70)), 3) \
-            .where(imagenFDIsc.gte(70).And(imagenFDIsc.lt(80)), 4) \
-            .where(imagenFDIsc.gte(80).And(imagenFDIsc.lt(91)), 5) \
-            .where(imagenFDIsc.gte(91), 6).clip(roi)
-
-        # Paleta de colores (tu simbología original)
-        Simbologia = ['267E00','56E200','FFFC00','FE7400','FF0000','9E00FF']
-        
-        # Etiquetas originales
-        Etiquetas = [
-            'Muy baja (<50)',
-            'Baja (50-60)',
-            'Media (60-70)',
-            'Alta (70-80)',
-            'Muy alta (80-91)',
-            'Extrema (>91)'
-        ]
-
-        # Parámetros de visualización
-        imagenFDIVis = {'min': 1, 'max': 6, 'palette': Simbologia, 'opacity': 0.70}
-
-        # Generar tiles
-        map_id = imagenFDI.getMapId(imagenFDIVis)
-
-        return {
-            "success": True,
-            "tile_url": map_id['tile_fetcher'].url_format,
-            "mapid": map_id['mapid'],
-            "token": map_id['token'],
-            "message": "Índice de Sequedad Combinado (ISC) generado exitosamente",
-            "algorithm": "Tu algoritmo original completo",
-            "date_range": f"{fechaInicio} a {fechaFin}",
-            "legend": {
-                "title": "Nivel de Sequedad",
-                "labels": Etiquetas,
-                "colors": Simbologia
-            },
-            "data_sources": {
-                "precipitation": "NASA GPM_L3/IMERG_V06",
-                "temperature": "ECMWF ERA5_LAND/DAILY_AGGR",
-                "ndvi": "MODIS/061/MOD13A2",
-                "boundaries": "FAO/GAUL/2015/level0"
-            }
-        }
-
+        return await run_ee_shared("/indice-sequedad", _indice_sequedad, timeout=EE_SLOW_TIMEOUT)
     except Exception as e:
-        if "not initialized" in str(e).lower():
-            if init_ee():
-                return await get_indice_sequedad()
-        
         return {"success": False, "error": str(e), "message": "Error procesando índice de sequedad"}
 
 import time
+import asyncio
 from datetime import datetime
 
 # Variable global para cache
 cache_data = {
     "sequedad": None,
-    "timestamp": None,
-    "processing": False
+    "timestamp": None
 }
 
+# Con varios workers, cache_data se sincroniza por versión con cache_store y
+# el lease evita que dos workers recalculen el ISC a la vez
+sequedad_snapshot = SharedSnapshot(cache_store, "sequedad", cache_data, "sequedad", SEQUEDAD_TTL)
+sequedad_lease = LeaseLock("actualizar-sequedad", ttl=EE_SLOW_TIMEOUT + 60)
+
+def sync_sequedad(forzar=False):
+    """Trae el ISC que haya guardado otro worker (y su ráster de teselas)"""
+    if not sequedad_snapshot.sync(forzar):
+        return False
+    tiles.load()
+    return True
+
 @app.get("/sequedad-cache")
 async def get_sequedad_cache():
     """Cargar índice de sequedad desde cache (rápido)"""
     try:
+        await asyncio.to_thread(sync_sequedad)
+
         # Si hay cache válido, devolverlo
         if cache_data["sequedad"] and cache_data["timestamp"]:
             age_minutes = (time.time() - cache_data["timestamp"]) / 60
@@ -382,182 +308,81 @@ async def get_sequedad_cache():
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+# Teselas locales del ISC: el FDI clasificado se descarga en cada actualización
+# y el mapa se navega sin volver a Earth Engine
+TILE_BOUNDS = [-92.0, -5.0, -75.2, 1.7]
+TILE_RES = float(os.getenv('TILE_RASTER_RES', '0.01'))
+TILE_PRERENDER_ZOOM = int(os.getenv('TILE_PRERENDER_ZOOM', '7'))
+tiles = TileRenderer(
+    os.path.join("data", "cache", "tiles"),
+    isc_pipeline.SIMBOLOGIA,
+    isc_pipeline.VISUALIZACION['opacity']
+)
+
+def _actualizar_teselas(rango):
+    """Descarga el FDI clasificado como ráster local; devuelve su versión (None si falla)"""
+    try:
+        clases = download_classes(isc_pipeline.fdi(rango=rango), TILE_BOUNDS, TILE_RES)
+        version = tiles.save(clases, TILE_BOUNDS, TILE_RES)
+        threading.Thread(target=tiles.prerender, args=(TILE_PRERENDER_ZOOM,), daemon=True).start()
+        return version
+    except Exception as e:
+        print(f"⚠️ No se generó el ráster local de teselas: {e}")
+        return None
+
+# Etapas de la actualización del ISC, en orden (se reportan al trabajo del scheduler)
+ETAPAS_SEQUEDAD = ['map_tiles', 'teselas', 'guardar']
+
+def _calcular_sequedad(progress):
+    """ISC para el cache (MR con valores fijos para ser más rápido)"""
+    progress('map_tiles')
+    mapa = isc_pipeline.map_tiles(rango=isc_pipeline.H100_RANGO_FIJO)
+    progress('teselas')
+    version = _actualizar_teselas(isc_pipeline.H100_RANGO_FIJO)
+
+    return {
+        **mapa,
+        "local_tile_url": "/tiles/{z}/{x}/{y}.png" if version else None,
+        "tiles_version": version,
+        "message": "Índice de Sequedad actualizado y almacenado en cache",
+        "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
+    }
+
+def _refrescar_sequedad(progress=None):
+    """Calcula el ISC con el lease tomado y lo guarda; None si otro worker ya lo está calculando.
+
+    El lease se renueva y se libera en el mismo hilo del cálculo, así que
+    sigue tomado aunque la petición se rinda por timeout mientras EE termina.
+    ``progress(etapa)`` se llama al iniciar cada etapa de ETAPAS_SEQUEDAD.
+    """
+    progress = progress or (lambda etapa: None)
+    with sequedad_lease.hold() as propio:
+        if not propio:
+            return None
+
+        result_data = _calcular_sequedad(progress)
+        progress('guardar')
+        cache_data["sequedad"] = result_data
+        cache_data["timestamp"] = time.time()
+        sequedad_snapshot.save()
+        return result_data
+
 @app.get("/actualizar-sequedad")
 async def actualizar_sequedad():
     """Procesar y actualizar cache del índice de sequedad"""
+    ocupado = {
+        "success": False, 
+        "message": "Ya se está procesando. Espera unos minutos.",
+        "processing": True
+    }
     try:
-        # Verificar si ya se está procesando
-        if cache_data["processing"]:
-            return {
-                "success": False, 
-                "message": "Ya se está procesando. Espera unos minutos.",
-                "processing": True
-            }
-        
-        # Marcar como procesando
-        cache_data["processing"] = True
-        
-        # Tu algoritmo completo (mismo código de antes)
-        roi = ee.FeatureCollection("FAO/GAUL/2015/level0").filter(ee.Filter.eq("ADM0_NAME","Ecuador"))
-        fechaInicio = '2024-01-01'
-        fechaFin = '2025-12-31'
-        
-        mascaracut = ee.Image(1).clip(roi)
-        def cortarcoleccion(imagen):
-            mascara = mascaracut.mask()
-            return imagen.updateMask(mascara)
-
-        # GPM Precipitación
-        gpmColeccion = ee.ImageCollection('NASA/GPM_L3/IMERG_V06') \
-            .select('precipitationCal') \
-            .filterBounds(roi) \
-            .filterDate(fechaInicio, fechaFin) \
-            .sort('system:time_end', False) \
-            .limit(48) \
-            .map(cortarcoleccion)
-
-        duracionPrecipitacion = gpmColeccion.sum().divide(2).rename('duracion')
-
-        # ERA5 Temperatura y punto de rocío
-        templast = ee.ImageCollection('ECMWF/ERA5_LAND/DAILY_AGGR') \
-            .select('temperature_2m') \
-            .filterBounds(roi) \
-            .map(cortarcoleccion) \
-            .filterDate(fechaInicio, fechaFin) \
-            .sort('system:time_end', False) \
-            .first()
-
-        dewpoint = ee.ImageCollection('ECMWF/ERA5_LAND/DAILY_AGGR') \
-            .select('dewpoint_temperature_2m') \
-            .filterBounds(roi) \
-            .map(cortarcoleccion) \
-            .filterDate(fechaInicio, fechaFin) \
-            .sort('system:time_end', False) \
-            .first()
-
-        # Humedad relativa
-        temperaK = templast.subtract(273.15)
-        dewpointK = dewpoint.subtract(273.15)
-        pvse = dewpointK.multiply(17.27).divide(dewpointK.add(237.3)).exp().multiply(6.1078)
-        pvses = temperaK.multiply(17.27).divide(temperaK.add(237.3)).exp().multiply(6.1078)
-        relativehumidity = pvse.divide(pvses).multiply(100).rename('relahumi')
-        datos = relativehumidity.addBands(templast).clip(roi)
-
-        # NDVI
-        coleccionNDVI = ee.ImageCollection("MODIS/061/MOD13A2") \
-            .select('NDVI') \
-            .filterDate(fechaInicio, fechaFin) \
-            .filterBounds(roi) \
-            .map(cortarcoleccion)
-        ndvilast = coleccionNDVI.sort('system:time_end', False).first().multiply(0.0001)
-
-        # NDVI min/max histórico
-        ndviHistorico = ee.ImageCollection("MODIS/061/MOD13A2") \
-            .select('NDVI') \
-            .filterDate('2020-01-01', '2024-12-31') \
-            .filterBounds(roi) \
-            .map(cortarcoleccion)
-        ndviStats = ndviHistorico.reduce(ee.Reducer.minMax())
-        minNDVI = ndviStats.select('NDVI_min').multiply(0.0001)
-        maxNDVI = ndviStats.select('NDVI_max').multiply(0.0001)
-
-        # EMC
-        EMC = datos.expression(
-            "(b('relahumi') < 10) ? 0.032229+0.281073*b('relahumi')-0.000578*b('relahumi')*b('temperature_2m')" +
-            ": (b('relahumi') < 50) ? 2.22749+0.160107*b('relahumi')-0.014784*b('temperature_2m')" +
-            ": 21.0606+0.005565*(b('relahumi')**2)-0.00035*b('relahumi')*b('temperature_2m')-0.483199*b('relahumi')"
-        ).rename('EMC')
-
-        # H100
-        h100inputs = EMC.addBands(duracionPrecipitacion).clip(roi)
-        h100 = h100inputs.expression(
-            "(24 - b('duracion')) * b('EMC') + b('duracion') * (0.5 * b('duracion') + 41)"
-        ).divide(24).rename('H100')
-
-        # LRmax
-        imagenLRmax = maxNDVI.expression(
-            '0.30 + 0.30 * ((NDVImax + 0.19) / (0.95 + 0.19))', {
-                'NDVImax': maxNDVI
-            }
-        ).rename('LRmax')
-
-        # RG
-        imagenRG = ndvilast.expression(
-            '((NDVI - NDVImin) / (NDVImax - NDVImin)) * 100', {
-                'NDVI': ndvilast.select('NDVI'),
-                'NDVImin': minNDVI,
-                'NDVImax': maxNDVI
-            }
-        ).rename('RG')
-
-        # LR
-        imagenLR = imagenRG.expression(
-            'RG * LRmax / 100', {
-                'RG': imagenRG,
-                'LRmax': imagenLRmax
-            }
-        ).rename('LR')
-
-        # MR (simplificado para cache)
-        h100Stats = h100.reduceRegion(
-            reducer=ee.Reducer.minMax(),
-            geometry=roi,
-            scale=5000,  # Escala más grande para ser más rápido
-            maxPixels=1e8
-        )
-        
-        H100min = ee.Image.constant(10)  # Valores fijos para ser más rápido
-        H100max = ee.Image.constant(50)
-
-        imagenMR = h100.expression(
-            '((H100 - H100min) / (H100max - H100min))', {
-                'H100': h100,
-                'H100min': H100min,
-                'H100max': H100max
-            }
-        ).rename('MR')
-
-        # FDI
-        imagenFDIsc = imagenLR.expression(
-            '((1 - LR) * (1 - MR)) * 100', {
-                'LR': imagenLR,
-                'MR': imagenMR
-            }
-        ).rename('FDI')
-
-        # Clasificación final
-        imagenFDI = ee.Image(0) \
-            .where(imagenFDIsc.lt(50), 1) \
-            .where(imagenFDIsc.gte(50).And(imagenFDIsc.lt(60)), 2) \
-            .where(imagenFDIsc.gte(60).And(imagenFDIsc.lt(70)), 3) \
-            .where(imagenFDIsc.gte(70).And(imagenFDIsc.lt(80)), 4) \
-            .where(imagenFDIsc.gte(80).And(imagenFDIsc.lt(91)), 5) \
-            .where(imagenFDIsc.gte(91), 6).clip(roi)
-
-        Simbologia = ['267E00','56E200','FFFC00','FE7400','FF0000','9E00FF']
-        Etiquetas = ['Muy baja (<50)', 'Baja (50-60)', 'Media (60-70)', 'Alta (70-80)', 'Muy alta (80-91)', 'Extrema (>91)']
-        imagenFDIVis = {'min': 1, 'max': 6, 'palette': Simbologia, 'opacity': 0.70}
-
-        # Generar tiles
-        map_id = imagenFDI.getMapId(imagenFDIVis)
-
-        # Guardar en cache
-        result_data = {
-            "tile_url": map_id['tile_fetcher'].url_format,
-            "mapid": map_id['mapid'],
-            "token": map_id['token'],
-            "message": "Índice de Sequedad actualizado y almacenado en cache",
-            "legend": {
-                "title": "Nivel de Sequedad",
-                "labels": Etiquetas,
-                "colors": Simbologia
-            },
-            "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
-        }
+        # Verificar si ya se está procesando (en este o en otro worker)
+        if await asyncio.to_thread(sequedad_lease.active):
+            return ocupado
 
-        cache_data["sequedad"] = result_data
-        cache_data["timestamp"] = time.time()
-        cache_data["processing"] = False
+        result_data = await run_ee(_refrescar_sequedad, timeout=EE_SLOW_TIMEOUT)
+        if result_data is None:
+            return ocupado
 
         return {
             "success": True,
@@ -566,59 +391,119 @@ async def actualizar_sequedad():
         }
 
     except Exception as e:
-        cache_data["processing"] = False
         return {"success": False, "error": str(e)}
 
+def run_sequedad_job(job):
+    """Actualización del ISC como trabajo en segundo plano (la lanza el scheduler)"""
+    result_data = run_ee_sync(_refrescar_sequedad, job.report, timeout=EE_SLOW_TIMEOUT)
+    if result_data is None:
+        return {"success": False, "error": "Otro worker ya está actualizando el índice de sequedad"}
+    return {"success": True, **result_data}
+
+def submit_sequedad_job():
+    return jobs.submit("actualizar-sequedad", run_sequedad_job, etapas=ETAPAS_SEQUEDAD)
+
+@app.get("/tiles/{z}/{x}/{y}.png")
+async def get_tile(z: int, x: int, y: int, if_none_match: str = Header(None)):
+    """Tesela PNG del ISC desde el ráster local (con ETag)"""
+    # Otro worker pudo activar un ráster nuevo (se consulta como mucho una vez por segundo)
+    if sequedad_snapshot.due():
+        await asyncio.to_thread(sync_sequedad)
+
+    etag = tiles.etag(z, x, y)
+    if etag and if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    resultado = await asyncio.to_thread(tiles.tile, z, x, y)
+    if resultado is None:
+        return Response(status_code=404)
+
+    png, etag = resultado
+    return Response(png, media_type="image/png",
+                    headers={"ETag": etag, "Cache-Control": "public, max-age=3600"})
+
 @app.get("/cache-status")
 async def cache_status():
     """Ver estado del cache"""
+    await asyncio.to_thread(sync_sequedad)
+    processing = await asyncio.to_thread(sequedad_lease.active)
     if cache_data["timestamp"]:
         age_minutes = (time.time() - cache_data["timestamp"]) / 60
         return {
             "cache_available": bool(cache_data["sequedad"]),
             "cache_age_minutes": round(age_minutes, 1),
-            "processing": cache_data["processing"],
+            "processing": processing,
             "last_update": datetime.fromtimestamp(cache_data["timestamp"]).strftime("%Y-%m-%d %H:%M:%S") if cache_data["timestamp"] else None
         }
     else:
         return {
             "cache_available": False,
-            "processing": cache_data["processing"],
+            "processing": processing,
             "message": "No hay cache disponible"
         }
 
-# Agregar estas líneas AL FINAL de tu main.py (antes del if __name__)
-from fire_processor import FireProcessor
+@app.get("/cache-metrics")
+async def cache_metrics():
+    """Aciertos y fallos de la caché de respuestas de EE"""
+    return {
+        "response_cache": response_cache.stats(),
+        "single_flight": single_flight.stats()
+    }
 
-fire_cache = {"data": None, "timestamp": None, "processing": False}
+# Agregar estas líneas AL FINAL de tu main.py (antes del if __name__)
+# El procesamiento de incendios corre en un hilo aparte (estado compartido en fire_service)
+from fire_service import fire_cache, fire_snapshot, jobs, submit_fire_job, fire_processing, load_fire_cache
+from scheduler import (scheduler_instance, schedule_fire_task, SEQUEDAD_SCHEDULE, SCHEDULER_JITTER,
+                       SCHEDULER_CHECKS, SEQUEDAD_POLL)
+
+def publicaciones_isc():
+    """Firma de las colecciones del ISC; pasa por el pool de EE con su timeout"""
+    return ee_executor.run_sync(isc_pipeline.ultimas_publicaciones, timeout=EE_TIMEOUT)
+
+def schedule_sequedad_task():
+    """Además de los incendios, el scheduler refresca el ISC cuando GPM, ERA5 o MODIS publican datos nuevos"""
+    scheduler_instance.add_task(
+        "actualizar-sequedad", submit_sequedad_job, SEQUEDAD_SCHEDULE, SCHEDULER_JITTER,
+        check=publicaciones_isc if SCHEDULER_CHECKS else None,
+        sondeo=SEQUEDAD_POLL
+    )
 
 @app.get("/process-fires")
 async def process_fires():
-    if fire_cache["processing"]:
-        return {"success": False, "message": "Ya procesando incendios..."}
-    
-    fire_cache["processing"] = True
-    try:
-        processor = FireProcessor()
-        result = processor.process_all()
-        fire_cache["data"] = result
-        fire_cache["timestamp"] = time.time()
-        fire_cache["processing"] = False
-        return result
-    except Exception as e:
-        fire_cache["processing"] = False
-        return {"success": False, "error": str(e)}
+    job, created = await asyncio.to_thread(submit_fire_job)
+    if job is None:
+        return {"success": False, "message": "Ya procesando incendios en otro worker...", "processing": True}
+    if not created:
+        return {"success": False, "message": "Ya procesando incendios...", "job_id": job.id,
+                "status_url": f"/jobs/{job.id}"}
+    return {"success": True, "message": "Procesamiento de incendios iniciado", "job_id": job.id,
+            "status_url": f"/jobs/{job.id}"}
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.to_dict(include_result=False) for job in jobs.list()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    datos = await asyncio.to_thread(jobs.status, job_id)
+    if datos is None:
+        return {"success": False, "error": "Trabajo no encontrado", "job_id": job_id}
+    return {"success": True, **datos}
 
 @app.get("/fires-status") 
 async def fires_status():
+    await asyncio.to_thread(fire_snapshot.sync)
+    activo = jobs.active("process-fires")
+    processing = await asyncio.to_thread(fire_processing)
     if fire_cache["timestamp"]:
         age_minutes = (time.time() - fire_cache["timestamp"]) / 60
         return {
             "cache_available": bool(fire_cache["data"]),
             "cache_age_minutes": round(age_minutes, 1),
-            "processing": fire_cache["processing"]
+            "processing": processing,
+            "job_id": activo.id if activo else None
         }
-    return {"cache_available": False, "processing": fire_cache["processing"]}
+    return {"cache_available": False, "processing": processing, "job_id": activo.id if activo else None}
 
 if __name__ == "__main__":
     import uvicorn
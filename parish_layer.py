@@ -0,0 +1,149 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pyproj import Transformer
+
+
+class ParishLayer:
+    """Capa de parroquias (ORGANIZACION_TERRITORIAL_PARROQUIAL) lista para consultas.
+
+    Se lee y reproyecta una sola vez por proceso y por CRS, y su índice
+    espacial (STRtree) se construye al cargarla. Además se guarda una copia
+    reproyectada en GeoParquet junto al shapefile, de modo que un proceso nuevo
+    no tenga que volver a parsear el shapefile ni reproyectarlo. La copia se
+    regenera si el shapefile es más reciente.
+    """
+
+    _instancias = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path, crs='EPSG:32717', cache_dir=None):
+        self.path = path
+        self.crs = crs
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(path), "cache")
+        self.gdf = self._cargar()
+
+        # Construir el STRtree ahora y no en la primera consulta
+        self.sindex = self.gdf.sindex
+
+    @classmethod
+    def get(cls, path, crs='EPSG:32717'):
+        """Instancia compartida del proceso para ese archivo y CRS"""
+        clave = (os.path.abspath(path), str(crs))
+
+        with cls._lock:
+            if clave not in cls._instancias:
+                cls._instancias[clave] = cls(path, crs)
+            return cls._instancias[clave]
+
+    @property
+    def cache_path(self):
+        nombre = os.path.splitext(os.path.basename(self.path))[0]
+        epsg = str(self.crs).replace(':', '_')
+        return os.path.join(self.cache_dir, f"{nombre}_{epsg}.parquet")
+
+    def _cargar(self):
+        if self._cache_vigente():
+            try:
+                return gpd.read_parquet(self.cache_path)
+            except Exception as e:
+                print(f"⚠️ No se pudo leer la copia de parroquias ({e}), usando el shapefile")
+
+        gdf = gpd.read_file(self.path)
+        if gdf.crs != self.crs:
+            gdf = gdf.to_crs(self.crs)
+
+        self._guardar_cache(gdf)
+        return gdf
+
+    def _cache_vigente(self):
+        if not os.path.exists(self.cache_path):
+            return False
+        if not os.path.exists(self.path):
+            return True
+        return os.path.getmtime(self.cache_path) >= os.path.getmtime(self.path)
+
+    def _guardar_cache(self, gdf):
+        # La copia es opcional: sin pyarrow o sin permisos de escritura se sigue en memoria
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporal = f"{self.cache_path}.tmp"
+            gdf.to_parquet(temporal)
+            os.replace(temporal, self.cache_path)
+        except Exception as e:
+            print(f"⚠️ No se guardó la copia GeoParquet de parroquias: {e}")
+
+
+class ParishLookup:
+    """Provincia, cantón y parroquia (DPA_DESPRO/DESCAN/DESPAR) de puntos o geometrías.
+
+    Las consultas son masivas: los candidatos salen del STRtree de la capa y el
+    predicado exacto solo se evalúa sobre ellos. Lo usan el procesamiento de
+    incendios y puede reutilizarse desde la API o para resúmenes por parroquia.
+    """
+
+    COLUMNAS = ['DPA_DESPRO', 'DPA_DESCAN', 'DPA_DESPAR']
+
+    def __init__(self, layer):
+        self.layer = layer
+
+    @classmethod
+    def get(cls, path, crs='EPSG:32717'):
+        return cls(ParishLayer.get(path, crs))
+
+    def locate(self, geometrias, predicate='intersects'):
+        """Índice posicional de la parroquia de cada geometría (-1 si ninguna).
+
+        Si una geometría toca varias parroquias se toma la de menor índice.
+        """
+        geometrias = np.asarray(geometrias, dtype=object)
+        resultado = np.full(len(geometrias), -1, dtype=np.int64)
+
+        if len(geometrias) == 0:
+            return resultado
+
+        entrada, parroquia = self.layer.sindex.query(geometrias, predicate=predicate)
+        orden = np.lexsort((parroquia, entrada))
+        entrada, parroquia = entrada[orden], parroquia[orden]
+        _, primeras = np.unique(entrada, return_index=True)
+
+        resultado[entrada[primeras]] = parroquia[primeras]
+        return resultado
+
+    def locate_points(self, x, y):
+        """Parroquia de cada punto (x, y en el CRS de la capa)"""
+        return self.locate(shapely.points(np.asarray(x, dtype=float), np.asarray(y, dtype=float)))
+
+    def locate_lonlat(self, lon, lat):
+        """Parroquia de cada punto en coordenadas geográficas (EPSG:4326)"""
+        a_capa = Transformer.from_crs('EPSG:4326', self.layer.gdf.crs, always_xy=True)
+        return self.locate_points(*a_capa.transform(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)))
+
+    def attributes(self, indices, columnas=None):
+        """Atributos de las parroquias indicadas; NaN donde el índice es -1"""
+        columnas = columnas or self.COLUMNAS
+        indices = np.asarray(indices)
+        encontrados = indices >= 0
+
+        datos = pd.DataFrame(index=range(len(indices)), columns=columnas, dtype=object)
+        datos.loc[encontrados, columnas] = self.layer.gdf[columnas].values[indices[encontrados]]
+        return datos
+
+    def lookup(self, geometrias, columnas=None):
+        """Ubicación de cada geometría por su punto representativo.
+
+        Las que caen fuera de toda parroquia (p. ej. polígonos en la costa con el
+        punto representativo en el mar) se resuelven por intersección con la
+        geometría completa.
+        """
+        geometrias = np.asarray(geometrias, dtype=object)
+        indices = self.locate(shapely.point_on_surface(geometrias))
+
+        faltantes = np.flatnonzero(indices < 0)
+        if len(faltantes):
+            indices[faltantes] = self.locate(geometrias[faltantes])
+
+        return self.attributes(indices, columnas)
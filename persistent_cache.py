@@ -0,0 +1,189 @@
+import os
+import abc
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+from contextlib import closing, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+# Formato de las entradas; las de otro formato se ignoran al leer
+FORMATO = 1
+
+
+def _a_json(valor):
+    # Los resultados del procesamiento traen escalares de numpy
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"{type(valor).__name__} no es serializable a JSON")
+
+
+class CacheBackend(abc.ABC):
+    """Almacén persistente de entradas versionadas con metadatos de TTL.
+
+    Cada entrada guarda el valor (JSON), su versión (se incrementa en cada
+    escritura), cuándo se guardó y su TTL en segundos (None = no vence).
+    ``get`` no devuelve entradas vencidas salvo que se pida.
+    """
+
+    def get(self, clave, incluir_vencidas=False):
+        entrada = self._leer(clave)
+        if entrada is None or entrada.get('formato') != FORMATO:
+            return None
+        if not incluir_vencidas and self.expired(entrada):
+            return None
+        return entrada
+
+    @abc.abstractmethod
+    def set(self, clave, valor, ttl=None):
+        """Guarda el valor con la versión siguiente y devuelve la entrada escrita"""
+
+    @abc.abstractmethod
+    def delete(self, clave):
+        """Elimina la entrada (no falla si no existe)"""
+
+    @abc.abstractmethod
+    def _leer(self, clave):
+        """Entrada guardada en ``clave`` o None"""
+
+    def version(self, clave):
+        """Versión actual de la entrada (None si no existe)"""
+        entrada = self._leer(clave)
+        return entrada['version'] if entrada else None
+
+    @staticmethod
+    def expired(entrada):
+        return entrada['ttl'] is not None and time.time() - entrada['guardado'] > entrada['ttl']
+
+    @staticmethod
+    def _entrada(version, valor, ttl):
+        return {
+            'formato': FORMATO,
+            'version': version,
+            'guardado': time.time(),
+            'ttl': ttl,
+            'valor': json.loads(json.dumps(valor, default=_a_json))
+        }
+
+
+class FileCacheBackend(CacheBackend):
+    """Un archivo JSON por clave, escrito de forma atómica (temporal + rename).
+
+    Leer la versión anterior y escribir la nueva ocurre bajo un ``flock`` del
+    archivo ``<clave>.lock``, así que dos procesos no escriben la misma
+    versión. Sin fcntl (Windows) solo el backend SQLite es seguro entre
+    procesos.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    @contextmanager
+    def _bloqueo(self, clave):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self._ruta(clave)}.lock", 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _leer(self, clave):
+        try:
+            with open(self._ruta(clave)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, clave, valor, ttl=None):
+        with self._bloqueo(clave):
+            anterior = self._leer(clave)
+            entrada = self._entrada((anterior or {}).get('version', 0) + 1, valor, ttl)
+            self._escribir(clave, entrada)
+        return entrada
+
+    def _escribir(self, clave, entrada):
+        temporal = f"{self._ruta(clave)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'w') as f:
+            json.dump(entrada, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._ruta(clave))
+
+    def delete(self, clave):
+        try:
+            os.remove(self._ruta(clave))
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Entradas en una tabla SQLite; cada escritura es una transacción"""
+
+    def __init__(self, path):
+        self.path = path
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with self._connect() as con, con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("CREATE TABLE IF NOT EXISTS cache (clave TEXT PRIMARY KEY, formato INTEGER, "
+                        "version INTEGER, guardado REAL, ttl REAL, valor TEXT)")
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def _leer(self, clave):
+        with self._connect() as con:
+            fila = con.execute("SELECT formato, version, guardado, ttl, valor FROM cache WHERE clave = ?",
+                               (clave,)).fetchone()
+        if fila is None:
+            return None
+        formato, version, guardado, ttl, valor = fila
+        return {'formato': formato, 'version': version, 'guardado': guardado, 'ttl': ttl,
+                'valor': json.loads(valor)}
+
+    def version(self, clave):
+        with self._connect() as con:
+            fila = con.execute("SELECT version FROM cache WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def set(self, clave, valor, ttl=None):
+        # La versión se incrementa dentro de la misma transacción que la escritura
+        texto = json.dumps(valor, default=_a_json)
+        with self._connect() as con, con:
+            con.execute(
+                "INSERT INTO cache VALUES (?, ?, 1, ?, ?, ?) ON CONFLICT(clave) DO UPDATE SET "
+                "formato = excluded.formato, version = cache.version + 1, guardado = excluded.guardado, "
+                "ttl = excluded.ttl, valor = excluded.valor",
+                (clave, FORMATO, time.time(), ttl, texto)
+            )
+        return self._leer(clave)
+
+    def delete(self, clave):
+        with self._connect() as con, con:
+            con.execute("DELETE FROM cache WHERE clave = ?", (clave,))
+
+
+def make_backend(url=None):
+    """Backend según una URL: ``sqlite:///ruta.sqlite`` (por omisión) o ``file:///directorio``"""
+    url = url or os.getenv('CACHE_BACKEND') or f"sqlite:///{os.path.join('data', 'cache', 'api_cache.sqlite')}"
+    esquema, _, ruta = url.partition(':///')
+
+    if esquema == 'sqlite':
+        return SQLiteCacheBackend(ruta)
+    if esquema == 'file':
+        return FileCacheBackend(ruta)
+    raise ValueError(f"Backend de cache no soportado: {url}")
+
@@ -0,0 +1,167 @@
+import json
+import time
+import asyncio
+from collections import OrderedDict
+
+
+def request_key(endpoint, params=None):
+    """Clave estable de una consulta: endpoint más parámetros ordenados"""
+    if not params:
+        return endpoint
+    return f"{endpoint}?{json.dumps(params, sort_keys=True, default=str)}"
+
+
+class SingleFlight:
+    """Agrupa consultas idénticas concurrentes en una sola ejecución.
+
+    La primera consulta con una clave lanza el cálculo; las que llegan
+    mientras sigue en curso esperan esa misma tarea y reciben su resultado (o
+    su excepción). Al terminar, la clave se libera y la siguiente consulta
+    vuelve a calcular. La tarea compartida está protegida con ``shield``: si un
+    cliente se desconecta, el cálculo sigue para los demás.
+    """
+
+    def __init__(self):
+        self._en_vuelo = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, clave, funcion):
+        """Espera ``funcion()`` (una corrutina) compartiéndola por ``clave``"""
+        self.calls += 1
+        tarea = self._en_vuelo.get(clave)
+
+        if tarea is None:
+            tarea = asyncio.ensure_future(funcion())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda _: self._liberar(clave, tarea))
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(tarea)
+
+    def _liberar(self, clave, tarea):
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        # Marcar la excepción como leída aunque todos los clientes se hayan ido
+        if not tarea.cancelled():
+            tarea.exception()
+
+    def in_flight(self):
+        return sorted(self._en_vuelo)
+
+    def is_in_flight(self, clave):
+        return clave in self._en_vuelo
+
+    def stats(self):
+        return {"calls": self.calls, "shared": self.shared, "in_flight": self.in_flight()}
+
+
+class TTLCache:
+    """Caché en memoria de respuestas con TTL, stale-while-revalidate y LRU.
+
+    Una entrada es fresca durante ``ttl`` segundos y se sirve sin más. Pasado
+    el TTL, durante ``stale_ttl`` segundos más se sigue sirviendo la copia
+    vieja mientras se recalcula en segundo plano; después se calcula de nuevo
+    esperando el resultado. Los cálculos pasan por un ``SingleFlight``, así que
+    nunca hay dos iguales a la vez. Con más de ``max_entries`` entradas se
+    descartan las usadas hace más tiempo. Solo se guardan los resultados que
+    ``cacheable`` acepta (por omisión, los que no traen ``success: False``).
+    """
+
+    def __init__(self, max_entries=128, single_flight=None):
+        self.max_entries = max_entries
+        self.single_flight = single_flight or SingleFlight()
+        self._entradas = OrderedDict()
+        self._refrescos = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cacheable(valor):
+        return not (isinstance(valor, dict) and valor.get('success') is False)
+
+    async def get_or_compute(self, clave, funcion, ttl, stale_ttl=0):
+        """Valor en caché para ``clave`` o el resultado de ``await funcion()``"""
+        entrada = self._entradas.get(clave)
+
+        if entrada is not None:
+            edad = time.monotonic() - entrada['guardado']
+            if edad < ttl:
+                self.hits += 1
+                self._entradas.move_to_end(clave)
+                return entrada['valor']
+            if edad < ttl + stale_ttl:
+                self.stale_hits += 1
+                self._entradas.move_to_end(clave)
+                self._refrescar_en_fondo(clave, funcion)
+                return entrada['valor']
+
+        # Si el mismo cálculo ya está en curso se espera sin volver a EE
+        if self.single_flight.is_in_flight(clave):
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        valor = await self.single_flight.do(clave, funcion)
+        self._guardar(clave, valor)
+        return valor
+
+    def _refrescar_en_fondo(self, clave, funcion):
+        if self.single_flight.is_in_flight(clave):
+            return
+
+        async def refrescar():
+            try:
+                self._guardar(clave, await self.single_flight.do(clave, funcion))
+                self.refreshes += 1
+            except Exception as e:
+                # Se sigue sirviendo la copia vieja hasta que venza stale_ttl
+                self.refresh_errors += 1
+                print(f"⚠️ No se pudo refrescar {clave}: {e}")
+
+        tarea = asyncio.ensure_future(refrescar())
+        self._refrescos.add(tarea)
+        tarea.add_done_callback(self._refrescos.discard)
+
+    def _guardar(self, clave, valor):
+        if not self.cacheable(valor):
+            return
+        self._entradas[clave] = {'valor': valor, 'guardado': time.monotonic()}
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entries:
+            self._entradas.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, clave=None):
+        """Descarta una entrada (o todas)"""
+        if clave is None:
+            self._entradas.clear()
+        else:
+            self._entradas.pop(clave, None)
+
+    def age(self, clave):
+        """Segundos desde que se guardó la entrada (None si no está)"""
+        entrada = self._entradas.get(clave)
+        return time.monotonic() - entrada['guardado'] if entrada else None
+
+    def stats(self):
+        # Las consultas agrupadas en un cálculo en curso no cuentan como fallo
+        servidas = self.hits + self.stale_hits + self.coalesced
+        consultas = servidas + self.misses
+        return {
+            "entries": len(self._entradas),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(servidas / consultas, 3) if consultas else None,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions
+        }
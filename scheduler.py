@@ -1,66 +1,232 @@
-import schedule
+import os
+import json
 import time
-import requests
+import random
 import threading
-from datetime import datetime
-import os
+from datetime import datetime, timedelta, timezone
+from fire_service import submit_fire_job
+from fire_processor import FIRMS_URL, FIRMS_KEY, FIRMS_SOURCES, AREA_COORDS
+from persistent_cache import make_backend
+from upstream_checks import FirmsCheck
+
+# Horarios en UTC ("HH:MM" separados por coma)
+FIRE_SCHEDULE = os.getenv('FIRE_SCHEDULE', '06:00,12:00,18:00')
+SEQUEDAD_SCHEDULE = os.getenv('SEQUEDAD_SCHEDULE', '05:00')
+# Retraso aleatorio máximo (s) sobre cada horario para no coincidir con otras réplicas
+SCHEDULER_JITTER = int(os.getenv('SCHEDULER_JITTER', '300'))
+
+# Con SCHEDULER_CHECKS (por omisión) los pipelines corren cuando la fuente
+# publica datos nuevos; los horarios fijos quedan como respaldo si la
+# verificación falla. En temporada de incendios FIRMS se consulta más seguido.
+SCHEDULER_CHECKS = os.getenv('SCHEDULER_CHECKS', '1') != '0'
+FIRE_SEASON_MONTHS = [int(mes) for mes in os.getenv('FIRE_SEASON_MONTHS', '7,8,9,10,11,12').split(',')]
+FIRE_POLL_SEASON = int(os.getenv('FIRE_POLL_SEASON', '900'))
+FIRE_POLL_OFF = int(os.getenv('FIRE_POLL_OFF', '3600'))
+SEQUEDAD_POLL = int(os.getenv('SEQUEDAD_POLL', str(6 * 3600)))
+
+
+def en_temporada(fecha):
+    return fecha.month in FIRE_SEASON_MONTHS
+
+
+def sondeo_incendios(ahora):
+    return FIRE_POLL_SEASON if en_temporada(ahora) else FIRE_POLL_OFF
+
+
+def ultimo_horario(horas, ahora):
+    """Horario programado más reciente que no sea posterior a ``ahora``"""
+    candidatos = []
+    for dia in (ahora.date() - timedelta(days=1), ahora.date()):
+        for hora in horas:
+            h, m = map(int, hora.split(':'))
+            momento = datetime(dia.year, dia.month, dia.day, h, m, tzinfo=timezone.utc)
+            if momento <= ahora:
+                candidatos.append(momento)
+    return max(candidatos)
+
+
+class ScheduledTask:
+    """Una tarea programada: ``lanzar()`` la envía al sistema de trabajos y devuelve (job, creado).
+
+    ``check`` (opcional) devuelve la firma de los datos de origen y se consulta
+    cada ``sondeo`` segundos (un número o una función de la hora actual).
+    """
+
+    def __init__(self, nombre, lanzar, horas, jitter=0, check=None, sondeo=3600):
+        self.nombre = nombre
+        self.lanzar = lanzar
+        self.horas = [hora.strip() for hora in horas.split(',')] if isinstance(horas, str) else list(horas)
+        self.jitter = jitter
+        self.check = check
+        self.sondeo = sondeo
+        self.job = None
+        self.firma = None
+        self.sondeado = None
+        self.verificada = False
+        self._retraso = (None, 0)
+
+    def periodo(self, ahora):
+        return self.sondeo(ahora) if callable(self.sondeo) else self.sondeo
+
+    def retraso(self, horario):
+        # Un retraso aleatorio por horario, fijo mientras ese horario esté pendiente
+        if self._retraso[0] != horario:
+            self._retraso = (horario, random.uniform(0, self.jitter))
+        return self._retraso[1]
+
 
 class FireScheduler:
-    def __init__(self):
-        self.api_base = os.getenv('RAILWAY_API_BASE', 'http://localhost:8000')
+    """Programa el procesamiento de incendios y la actualización del ISC.
+
+    Las tareas se envían directamente al sistema de trabajos (sin pasar por
+    HTTP). Una tarea con verificación se lanza solo cuando la firma de sus
+    datos de origen difiere de la última procesada. Sin
+    verificación, o si esta falla, se usa el horario fijo: cada minuto se
+    revisa el horario más reciente y, si no se atendió (porque el proceso
+    estaba caído, por ejemplo), se ejecuta una vez para ponerse al día. Las
+    firmas y el último horario atendido se guardan en el almacén compartido,
+    así que los reinicios y los demás workers los respetan. Una tarea no se
+    relanza mientras su trabajo siga en curso, y el lease de cada pipeline
+    evita que dos workers la corran a la vez.
+    """
+
+    def __init__(self, store=None, intervalo=60):
+        self.store = store or make_backend()
+        self.intervalo = intervalo
+        self.tareas = {}
         self.running = False
-        
-    def process_fires_job(self):
-        print(f"[{datetime.now()}] Iniciando procesamiento programado de incendios...")
-        
-        try:
-            response = requests.post(f"{self.api_base}/process-fires", timeout=3600)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('success'):
-                    stats = result.get('stats', {})
-                    print(f"✅ Procesamiento exitoso:")
-                    print(f"   - Polígonos: {stats.get('total_poligonos', 'N/A')}")
-                    print(f"   - Eventos: {stats.get('eventos_unicos', 'N/A')}")
-                    print(f"   - Eventos grandes: {stats.get('eventos_grandes', 'N/A')}")
+        self._thread = None
+
+    def add_task(self, nombre, lanzar, horas, jitter=0, check=None, sondeo=3600):
+        self.tareas[nombre] = ScheduledTask(nombre, lanzar, horas, jitter, check, sondeo)
+
+    def _atendido(self, nombre):
+        # Una entrada por tarea para que los workers no se pisen al guardar
+        entrada = self.store.get(f"scheduler-{nombre}")
+        return entrada['valor'] if entrada else 0
+
+    def _marcar(self, nombre, horario):
+        self.store.set(f"scheduler-{nombre}", horario.timestamp())
+
+    def _firma(self, nombre):
+        entrada = self.store.get(f"scheduler-{nombre}-firma")
+        return entrada['valor'] if entrada else None
+
+    def _motivo(self, tarea, ahora, horario):
+        """Por qué lanzar la tarea ahora (None si no toca)"""
+        if tarea.check is not None:
+            if tarea.sondeado is None or (ahora - tarea.sondeado).total_seconds() >= tarea.periodo(ahora):
+                tarea.sondeado = ahora
+                try:
+                    # Ida y vuelta por JSON para compararla con la guardada
+                    firma = json.loads(json.dumps(tarea.check(), default=str))
+                    tarea.verificada = True
+                except Exception as e:
+                    print(f"⚠️ No se pudo verificar {tarea.nombre}, se usa el horario fijo: {e}")
+                    tarea.verificada = False
                 else:
-                    print(f"❌ Error en procesamiento: {result.get('error')}")
+                    if firma != self._firma(tarea.nombre):
+                        tarea.firma = firma
+                        return "datos nuevos"
+            if tarea.verificada:
+                return None
+
+        if self._atendido(tarea.nombre) >= horario.timestamp():
+            return None
+        if ahora < horario + timedelta(seconds=tarea.retraso(horario)):
+            return None
+        return f"horario {horario:%Y-%m-%d %H:%M} UTC"
+
+    def tick(self, ahora=None):
+        """Revisa las tareas una vez y lanza las que tengan datos nuevos o un horario pendiente"""
+        ahora = ahora or datetime.now(timezone.utc)
+
+        for tarea in self.tareas.values():
+            if tarea.job is not None:
+                if not tarea.job.finished:
+                    continue
+                self._informar(tarea)
+                # La firma queda procesada con cualquier ejecución que terminó (también
+                # "sin datos nuevos" o con error); lo pendiente lo retoma la siguiente
+                if tarea.firma is not None:
+                    self.store.set(f"scheduler-{tarea.nombre}-firma", tarea.firma)
+                tarea.job = None
+                tarea.firma = None
+
+            horario = ultimo_horario(tarea.horas, ahora)
+            motivo = self._motivo(tarea, ahora, horario)
+            if motivo is None:
+                continue
+
+            print(f"[{ahora:%Y-%m-%d %H:%M}] Lanzando {tarea.nombre} ({motivo})")
+            try:
+                job, creado = tarea.lanzar()
+            except Exception as e:
+                print(f"❌ Error lanzando {tarea.nombre}: {e}")
+                tarea.firma = None
+                continue
+
+            if job is None:
+                print(f"⏭️ {tarea.nombre} ya se está ejecutando en otro worker")
+            elif not creado:
+                print(f"⏭️ {tarea.nombre} ya estaba en curso (trabajo {job.id})")
             else:
-                print(f"❌ Error HTTP: {response.status_code}")
-                
-        except requests.exceptions.Timeout:
-            print("⏰ Timeout - El procesamiento está tomando más tiempo del esperado")
-        except Exception as e:
-            print(f"❌ Error en job programado: {e}")
-    
+                tarea.job = job
+            if tarea.job is None:
+                tarea.firma = None
+            self._marcar(tarea.nombre, horario)
+
+    def _informar(self, tarea):
+        job = tarea.job
+        if job.status == 'error':
+            print(f"❌ Error en {tarea.nombre}: {job.error}")
+            return
+
+        print(f"✅ {tarea.nombre} terminado en {job.finished_at - job.started_at:.0f} s")
+        stats = (job.result or {}).get('stats') if isinstance(job.result, dict) else None
+        if stats:
+            print(f"   - Polígonos: {stats.get('total_poligonos', 'N/A')}")
+            print(f"   - Eventos: {stats.get('eventos_unicos', 'N/A')}")
+            print(f"   - Eventos grandes: {stats.get('eventos_grandes', 'N/A')}")
+
     def start_scheduler(self):
-        print("🚀 Iniciando scheduler de incendios...")
-        print("📅 Programado cada 12 horas: 06:00 y 18:00 UTC")
-        
-        schedule.every().day.at("06:00").do(self.process_fires_job)
-        schedule.every().day.at("12:00").do(self.process_fires_job)
-        schedule.every().day.at("18:00").do(self.process_fires_job)
-        
+        print("🚀 Iniciando scheduler...")
+        for tarea in self.tareas.values():
+            verificacion = " (si hay datos nuevos)" if tarea.check is not None else ""
+            print(f"📅 {tarea.nombre}: {', '.join(tarea.horas)} UTC{verificacion}")
+
         self.running = True
-        
+
         while self.running:
-            schedule.run_pending()
-            time.sleep(60)
-    
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"❌ Error en scheduler: {e}")
+            time.sleep(self.intervalo)
+
     def start_in_background(self):
-        def run_scheduler():
-            self.start_scheduler()
-        
-        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        scheduler_thread.start()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.start_scheduler, daemon=True)
+        self._thread.start()
         print("🔄 Scheduler ejecutándose en background")
-        
+
     def stop(self):
         self.running = False
         print("🛑 Scheduler detenido")
 
 scheduler_instance = FireScheduler()
 
+
+def schedule_fire_task():
+    """Programa el procesamiento de incendios (desde el arranque de la app, no al importar)"""
+    scheduler_instance.add_task(
+        "process-fires", submit_fire_job, FIRE_SCHEDULE, SCHEDULER_JITTER,
+        check=FirmsCheck(FIRMS_URL, FIRMS_KEY, AREA_COORDS, FIRMS_SOURCES) if SCHEDULER_CHECKS else None,
+        sondeo=sondeo_incendios
+    )
+
+
 if __name__ == "__main__":
+    schedule_fire_task()
     scheduler_instance.start_scheduler()
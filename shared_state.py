@@ -0,0 +1,169 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+# Base SQLite de los leases compartida por los workers (debe estar en un volumen común)
+LOCK_PATH = os.getenv('LOCK_PATH', os.path.join("data", "cache", "locks.sqlite"))
+
+
+class LeaseLock:
+    """Candado entre procesos con vencimiento (lease) sobre SQLite.
+
+    Sirve para que, con varios workers de uvicorn o varias réplicas sobre el
+    mismo volumen, un cálculo largo corra una sola vez. El dueño renueva el
+    lease mientras trabaja (``hold``); si el proceso muere, el lease vence a
+    los ``ttl`` segundos y otro puede tomarlo.
+    """
+
+    def __init__(self, nombre, ttl=300, path=None):
+        self.path = path or LOCK_PATH
+        self.nombre = nombre
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        directorio = os.path.dirname(self.path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS leases (nombre TEXT PRIMARY KEY, owner TEXT, expira REAL)")
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def acquire(self):
+        """Intenta tomar el lease; devuelve True si ahora es nuestro"""
+        ahora = time.time()
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                # No es reentrante: si el lease vigente es nuestro, otro hilo ya lo está usando
+                fila = con.execute("SELECT expira FROM leases WHERE nombre = ?", (self.nombre,)).fetchone()
+                if fila and fila[0] > ahora:
+                    return False
+                con.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)",
+                            (self.nombre, self.owner, ahora + self.ttl))
+                return True
+            finally:
+                con.execute("COMMIT")
+
+    def renew(self):
+        """Extiende el lease si sigue siendo nuestro"""
+        with self._connect() as con:
+            cursor = con.execute("UPDATE leases SET expira = ? WHERE nombre = ? AND owner = ?",
+                                 (time.time() + self.ttl, self.nombre, self.owner))
+        return cursor.rowcount == 1
+
+    def release(self):
+        with self._connect() as con:
+            con.execute("DELETE FROM leases WHERE nombre = ? AND owner = ?", (self.nombre, self.owner))
+
+    def holder(self):
+        """Dueño del lease vigente (None si está libre)"""
+        with self._connect() as con:
+            fila = con.execute("SELECT owner, expira FROM leases WHERE nombre = ?", (self.nombre,)).fetchone()
+        return fila[0] if fila and fila[1] > time.time() else None
+
+    def active(self):
+        return self.holder() is not None
+
+    @contextmanager
+    def hold(self):
+        """Toma el lease y lo renueva en segundo plano; entrega False si lo tiene otro"""
+        if not self.acquire():
+            yield False
+            return
+
+        terminado = threading.Event()
+
+        def renovar():
+            while not terminado.wait(self.ttl / 3):
+                if not self.renew():
+                    print(f"⚠️ Se perdió el lease {self.nombre}")
+                    return
+
+        hilo = threading.Thread(target=renovar, daemon=True)
+        hilo.start()
+        try:
+            yield True
+        finally:
+            terminado.set()
+            hilo.join()
+            self.release()
+
+
+class SharedSnapshot:
+    """Cache en memoria de un worker sincronizado con el almacén compartido.
+
+    ``save`` escribe el contenido en el backend (lo que incrementa su versión)
+    y ``sync`` lo recarga cuando otro worker guardó una versión más nueva. La
+    versión es la señal de invalidación: ``invalidate`` guarda una entrada
+    vacía y cada worker vacía su copia en el siguiente ``sync``. Para que las lecturas
+    sigan siendo baratas, ``sync`` consulta el backend como mucho una vez cada
+    ``intervalo`` segundos.
+    """
+
+    def __init__(self, backend, clave, cache, campo, ttl=None, intervalo=1.0):
+        self.backend = backend
+        self.clave = clave
+        self.cache = cache
+        self.campo = campo
+        self.ttl = ttl
+        self.intervalo = intervalo
+        self.version = None
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+
+    def save(self):
+        """Guarda el contenido actual (no interrumpe si falla)"""
+        try:
+            entrada = self.backend.set(self.clave, {"data": self.cache[self.campo],
+                                                    "timestamp": self.cache["timestamp"]}, self.ttl)
+            self.version = entrada['version']
+        except Exception as e:
+            print(f"⚠️ No se guardó la copia compartida de {self.clave}: {e}")
+
+    def due(self):
+        """Si ya pasó ``intervalo`` desde la última consulta al backend"""
+        return time.monotonic() - self._revisado >= self.intervalo
+
+    def sync(self, forzar=False):
+        """Trae la versión compartida si cambió; devuelve True si el cache cambió"""
+        ahora = time.monotonic()
+        if not forzar and not self.due():
+            return False
+
+        with self._lock:
+            self._revisado = ahora
+            try:
+                version = self.backend.version(self.clave)
+                if version == self.version:
+                    return False
+                entrada = self.backend.get(self.clave) if version is not None else None
+            except Exception as e:
+                print(f"⚠️ No se pudo leer la copia compartida de {self.clave}: {e}")
+                return False
+
+            if entrada is None:
+                # Invalidada (o vencida) en otro worker
+                if self.version is None:
+                    return False
+                self.cache[self.campo] = None
+                self.cache["timestamp"] = None
+            else:
+                self.cache[self.campo] = entrada['valor']['data']
+                self.cache["timestamp"] = entrada['valor']['timestamp']
+            self.version = version
+            return True
+
+    def invalidate(self):
+        """Descarta el contenido en todos los workers.
+
+        Se guarda una entrada vacía en lugar de borrarla para que la versión
+        siga creciendo y los demás workers noten el cambio.
+        """
+        self.cache[self.campo] = None
+        self.cache["timestamp"] = None
+        self.save()
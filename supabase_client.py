@@ -0,0 +1,280 @@
+import json
+import time
+import sqlite3
+import requests
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+
+class SupabaseClient:
+    """Sesión HTTP keep-alive contra la API REST (PostgREST) de Supabase"""
+
+    def __init__(self, url, key, timeout=60, pool_size=8):
+        self.url = url.rstrip('/')
+        self.key = key
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            'apikey': key,
+            'Authorization': f'Bearer {key}'
+        })
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def table_url(self, tabla):
+        return f"{self.url}/rest/v1/{tabla}"
+
+    def get_rows(self, tabla, params, headers=None):
+        """GET en streaming; devuelve un generador de filas JSON"""
+        response = self.session.get(self.table_url(tabla), params=params, headers=headers,
+                                    timeout=self.timeout, stream=True)
+        response.raise_for_status()
+        return iter_json_array(response)
+
+    def close(self):
+        self.session.close()
+
+
+def iter_json_array(response, chunk_size=65536):
+    """Recorre un arreglo JSON de objetos a medida que llega, sin cargarlo entero"""
+    decoder = json.JSONDecoder()
+    response.encoding = response.encoding or 'utf-8'
+    buffer = ''
+
+    with response:
+        for chunk in response.iter_content(chunk_size=chunk_size, decode_unicode=True):
+            buffer += chunk
+            posicion = 0
+
+            while True:
+                # Saltar apertura del arreglo, separadores y espacios
+                while posicion < len(buffer) and buffer[posicion] in '[, \t\r\n':
+                    posicion += 1
+
+                if posicion >= len(buffer) or buffer[posicion] == ']':
+                    break
+
+                try:
+                    objeto, posicion = decoder.raw_decode(buffer, posicion)
+                except json.JSONDecodeError:
+                    # Objeto incompleto: esperar el siguiente bloque
+                    break
+
+                yield objeto
+
+            buffer = buffer[posicion:]
+
+
+class EventIdLookup:
+    """Consulta qué evento_id ya existen en una tabla de Supabase.
+
+    Solo se pregunta por los IDs candidatos del lote actual
+    (``evento_id=in.(...)``, en bloques para no exceder el largo de la URL) y
+    las respuestas se leen en streaming. Los IDs confirmados se guardan en una
+    caché local SQLite, así que en la siguiente ejecución solo viajan los que
+    nunca se han visto. ``fetch_all`` recorre la tabla completa paginando con
+    cabeceras Range.
+    """
+
+    def __init__(self, client, tabla, cache_path, columna='evento_id', bloque=200, pagina=1000):
+        self.client = client
+        self.tabla = tabla
+        self.cache_path = cache_path
+        self.columna = columna
+        self.bloque = bloque
+        self.pagina = pagina
+        self._crear_tabla()
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.cache_path, timeout=30))
+
+    def _crear_tabla(self):
+        with self._connect() as con, con:
+            con.execute("CREATE TABLE IF NOT EXISTS ids_supabase (tabla TEXT, evento_id INTEGER, "
+                        "PRIMARY KEY (tabla, evento_id))")
+
+    def cached(self, candidatos=None):
+        """IDs de la caché local (solo los candidatos si se indican)"""
+        with self._connect() as con:
+            if candidatos is None:
+                filas = con.execute("SELECT evento_id FROM ids_supabase WHERE tabla = ?", (self.tabla,))
+                return {fila[0] for fila in filas}
+
+            con.execute("CREATE TEMP TABLE candidatos (evento_id INTEGER PRIMARY KEY)")
+            con.executemany("INSERT OR IGNORE INTO candidatos VALUES (?)", ((int(c),) for c in candidatos))
+            filas = con.execute(
+                "SELECT evento_id FROM ids_supabase WHERE tabla = ? "
+                "AND evento_id IN (SELECT evento_id FROM candidatos)",
+                (self.tabla,)
+            )
+            return {fila[0] for fila in filas}
+
+    def remember(self, ids):
+        """Agrega IDs a la caché local (p. ej. después de subirlos)"""
+        with self._connect() as con, con:
+            con.executemany("INSERT OR IGNORE INTO ids_supabase VALUES (?, ?)",
+                            ((self.tabla, int(i)) for i in ids))
+
+    def existing(self, candidatos):
+        """Subconjunto de los candidatos que ya existe en Supabase"""
+        candidatos = sorted({int(c) for c in candidatos})
+        conocidos = self.cached(candidatos)
+        pendientes = [c for c in candidatos if c not in conocidos]
+        encontrados = set()
+
+        for i in range(0, len(pendientes), self.bloque):
+            bloque = pendientes[i:i + self.bloque]
+            params = {
+                'select': self.columna,
+                self.columna: f"in.({','.join(map(str, bloque))})"
+            }
+            filas = self.client.get_rows(self.tabla, params)
+            encontrados.update(int(fila[self.columna]) for fila in filas if fila.get(self.columna))
+
+        self.remember(encontrados)
+        return conocidos | encontrados
+
+    def fetch_all(self):
+        """Todos los IDs de la tabla, paginando con Range; actualiza la caché"""
+        ids = set()
+        inicio = 0
+
+        while True:
+            headers = {'Range-Unit': 'items', 'Range': f"{inicio}-{inicio + self.pagina - 1}"}
+            params = {'select': self.columna, 'order': f"{self.columna}.asc"}
+            filas = self.client.get_rows(self.tabla, params, headers=headers)
+
+            recibidas = 0
+            for fila in filas:
+                recibidas += 1
+                if fila.get(self.columna):
+                    ids.add(int(fila[self.columna]))
+
+            if recibidas < self.pagina:
+                break
+            inicio += self.pagina
+
+        self.remember(ids)
+        return ids
+
+
+class SupabaseUploader:
+    """Sube registros a una tabla de Supabase en lotes concurrentes e idempotentes.
+
+    Los lotes se arman por tamaño del cuerpo JSON (y un máximo de filas) sin
+    partir nunca un grupo (p. ej. todas las filas de un evento), y se envían
+    por la sesión keep-alive del cliente con un número acotado de lotes en
+    vuelo. Cada POST es un upsert (``resolution=merge-duplicates``) y se
+    reintenta con backoff ante errores de conexión, 429 y 5xx; si el servidor
+    responde 413 el lote se parte en dos. Un lote fallido no detiene a los
+    demás y, como cada grupo viaja entero en un solo lote, volver a ejecutar
+    la subida tras un fallo parcial no deja eventos a medias.
+
+    El upsert se resuelve sobre ``on_conflict``, que debe tener una restricción
+    única en la tabla (p. ej. ``UNIQUE (evento_id, fecha)``); sin ella solo se
+    resuelve por la clave primaria y un reintento de un lote que sí llegó a
+    guardarse duplica sus filas. Si la tabla no tiene esa restricción
+    (PostgREST responde 42P10) se avisa y se sigue sin ``on_conflict``.
+    """
+
+    def __init__(self, client, tabla, max_in_flight=4, max_batch_bytes=2_000_000, max_batch_rows=1000,
+                 max_retries=3, backoff_factor=1.0, on_conflict=None):
+        self.client = client
+        self.tabla = tabla
+        self.max_in_flight = max_in_flight
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_rows = max_batch_rows
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.on_conflict = on_conflict
+
+    def build_batches(self, records, grupo=None):
+        """Lotes de registros serializados; devuelve listas de (clave, bytes)"""
+        # Agrupar contiguamente por la columna indicada (un grupo nunca se parte)
+        grupos = {}
+        for posicion, registro in enumerate(records):
+            clave = registro.get(grupo) if grupo else None
+            fila = (clave, json.dumps(registro).encode('utf-8'))
+            grupos.setdefault(clave if grupo else posicion, []).append(fila)
+
+        lotes = []
+        actual, bytes_actual = [], 0
+        for filas in grupos.values():
+            tamano = sum(len(cuerpo) + 1 for _, cuerpo in filas)
+            if actual and (bytes_actual + tamano > self.max_batch_bytes
+                           or len(actual) + len(filas) > self.max_batch_rows):
+                lotes.append(actual)
+                actual, bytes_actual = [], 0
+            actual.extend(filas)
+            bytes_actual += tamano
+
+        if actual:
+            lotes.append(actual)
+        return lotes
+
+    def upload(self, records, grupo=None):
+        """Sube todos los registros; devuelve un resumen con las claves subidas y los errores"""
+        lotes = self.build_batches(records, grupo)
+        resumen = {'rows': 0, 'batches': len(lotes), 'failed': 0, 'keys': set(), 'errors': []}
+
+        if not lotes:
+            return resumen
+
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(lotes))) as executor:
+            for numero, (lote, error) in enumerate(zip(lotes, executor.map(self._enviar, lotes)), start=1):
+                if error:
+                    resumen['failed'] += 1
+                    resumen['errors'].append(f"lote {numero}: {error}")
+                else:
+                    resumen['rows'] += len(lote)
+                    resumen['keys'].update(clave for clave, _ in lote)
+
+        return resumen
+
+    def _enviar(self, lote):
+        """POST de un lote con reintentos; devuelve None o el mensaje de error"""
+        cuerpo = b'[' + b','.join(fila for _, fila in lote) + b']'
+        headers = {
+            'Content-Type': 'application/json',
+            'Prefer': 'resolution=merge-duplicates,return=minimal'
+        }
+        params = {'on_conflict': self.on_conflict} if self.on_conflict else None
+
+        for intento in range(self.max_retries + 1):
+            try:
+                response = self.client.session.post(self.client.table_url(self.tabla), data=cuerpo,
+                                                    headers=headers, params=params,
+                                                    timeout=self.client.timeout)
+                if response.status_code in (200, 201, 204):
+                    return None
+
+                # Un lote de un solo grupo no se parte: se informa el 413
+                mitad = self._punto_de_corte(lote) if response.status_code == 413 else None
+                if mitad is not None:
+                    errores = [e for e in (self._enviar(lote[:mitad]), self._enviar(lote[mitad:])) if e]
+                    return '; '.join(errores) or None
+
+                if response.status_code == 400 and params and '42P10' in response.text:
+                    print(f"⚠️ {self.tabla} no tiene una restricción única sobre ({self.on_conflict}); "
+                          f"el upsert se resuelve solo por la clave primaria")
+                    self.on_conflict = None
+                    return self._enviar(lote)
+
+                error = f"{response.status_code} {response.text[:500]}"
+                if response.status_code != 429 and response.status_code < 500:
+                    return error
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+
+            if intento < self.max_retries:
+                time.sleep(self.backoff_factor * (2 ** intento))
+
+        return error
+
+    @staticmethod
+    def _punto_de_corte(lote):
+        # Partir en el cambio de grupo más cercano a la mitad (None si todo es un grupo)
+        cortes = [i for i in range(1, len(lote)) if lote[i][0] != lote[i - 1][0]]
+        return min(cortes, key=lambda i: abs(2 * i - len(lote))) if cortes else None
@@ -0,0 +1,69 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+
+class ServidorFalso:
+    """Servidor HTTP local para probar los clientes sin red.
+
+    Registra cada petición en ``peticiones`` y contesta con ``responder``, una
+    función que recibe la petición y devuelve ``(status, cuerpo, cabeceras)``.
+    Si el cuerpo es una lista de bytes se envía por partes (chunked).
+    """
+
+    def __init__(self):
+        self.peticiones = []
+        self.responder = lambda peticion: (200, b'', {})
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._http.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}"
+        threading.Thread(target=self._http.serve_forever, args=(0.05,), daemon=True).start()
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _atender(self):
+                largo = int(self.headers.get('Content-Length') or 0)
+                peticion = SimpleNamespace(metodo=self.command, ruta=self.path,
+                                           cabeceras=dict(self.headers), cuerpo=self.rfile.read(largo))
+                with servidor._lock:
+                    servidor.peticiones.append(peticion)
+                status, cuerpo, cabeceras = servidor.responder(peticion)
+
+                self.send_response(status)
+                for nombre, valor in cabeceras.items():
+                    self.send_header(nombre, valor)
+                if isinstance(cuerpo, list):
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for parte in cuerpo:
+                        self.wfile.write(f"{len(parte):x}\r\n".encode() + parte + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self.send_header('Content-Length', str(len(cuerpo)))
+                    self.end_headers()
+                    self.wfile.write(cuerpo)
+
+            do_GET = do_POST = _atender
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def cerrar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorFalso()
+    yield servidor
+    servidor.cerrar()
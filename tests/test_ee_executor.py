@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ee_executor import EEBusyError, EEExecutor, EETimeoutError
+
+# Las llamadas a Earth Engine se simulan con funciones que esperan un evento.
+
+
+@pytest.fixture
+def liberar():
+    evento = threading.Event()
+    yield evento
+    evento.set()
+
+
+def cuando_haya_cupo(executor, funcion, limite=2.0):
+    """Llama ``funcion`` en cuanto el pool la acepte (el cupo se libera desde otro hilo)"""
+    fin = time.monotonic() + limite
+    while True:
+        try:
+            return executor.run_sync(funcion)
+        except EEBusyError:
+            if time.monotonic() > fin:
+                raise
+            time.sleep(0.01)
+
+
+def test_run_devuelve_el_resultado():
+    executor = EEExecutor(max_workers=2, max_pending=2)
+    assert asyncio.run(executor.run(lambda a, b=0: a + b, 2, b=3)) == 5
+    assert executor.run_sync(lambda: "ok") == "ok"
+
+
+def test_excede_el_tiempo_limite(liberar):
+    executor = EEExecutor(max_workers=2, max_pending=4)
+
+    with pytest.raises(EETimeoutError):
+        asyncio.run(executor.run(liberar.wait, timeout=0.05))
+    with pytest.raises(EETimeoutError):
+        executor.run_sync(liberar.wait, timeout=0.05)
+
+
+def test_rechaza_cuando_hay_demasiadas_pendientes(liberar):
+    executor = EEExecutor(max_workers=1, max_pending=2)
+
+    # Una en curso y otra en cola: la tercera se rechaza sin esperar
+    executor._enviar(liberar.wait, (), {})
+    executor._enviar(liberar.wait, (), {})
+    with pytest.raises(EEBusyError):
+        executor.run_sync(lambda: None)
+
+
+def test_el_cupo_sigue_ocupado_hasta_que_termina_el_hilo(liberar):
+    executor = EEExecutor(max_workers=1, max_pending=1)
+
+    with pytest.raises(EETimeoutError):
+        executor.run_sync(liberar.wait, timeout=0.05)
+
+    # El hilo sigue corriendo después del timeout, así que su cupo no se libera
+    with pytest.raises(EEBusyError):
+        executor.run_sync(lambda: None)
+
+    liberar.set()
+    assert cuando_haya_cupo(executor, lambda: "ok") == "ok"
+
+
+def test_errores_de_la_llamada_liberan_el_cupo():
+    executor = EEExecutor(max_workers=1, max_pending=1)
+
+    with pytest.raises(ZeroDivisionError):
+        executor.run_sync(lambda: 1 / 0)
+    assert cuando_haya_cupo(executor, lambda: "ok") == "ok"
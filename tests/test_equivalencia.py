@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from scipy.spatial import Delaunay
+from shapely.geometry import Point
+from shapely.ops import unary_union
+
+from benchmark import (clustering_original, detecciones_sinteticas, id_unico_original,
+                       poligonos_de_eventos, sobreposiciones_original, triangulos_original)
+from fire_clustering import EventClusterer
+from fire_geometry import filter_triangles
+from fire_processor import FireProcessor
+
+# Las versiones optimizadas se comparan con las implementaciones originales
+# que conserva benchmark.py como referencia.
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setenv('FIRE_STORE_PATH', str(tmp_path / "detecciones.sqlite"))
+    monkeypatch.setenv('FIRE_SERIAL', '1')
+    return FireProcessor()
+
+
+def test_clustering_igual_al_flood_fill():
+    datos = detecciones_sinteticas(400, dias=6).sort_values('ACQ_DATE').reset_index(drop=True)
+    obtenido = EventClusterer(1000, 3).fit(datos.geometry.x.values, datos.geometry.y.values,
+                                           datos['ACQ_DATE'].values)
+    np.testing.assert_array_equal(obtenido, clustering_original(datos, 1000, 3))
+
+
+def test_filtro_de_triangulos_igual_al_original():
+    rng = np.random.default_rng(7)
+    puntos = rng.normal(0, 4_000, (1_000, 2)) + rng.choice([-6_000, 0, 6_000], (1_000, 2))
+    simplices = Delaunay(puntos).simplices
+
+    esperado = unary_union(triangulos_original(puntos, simplices))
+    assert unary_union(filter_triangles(puntos, simplices)).equals_exact(esperado, 0)
+
+
+def test_area_nueva_igual_a_la_original(processor):
+    poligonos = poligonos_de_eventos(processor, 30)
+    esperado = sobreposiciones_original(poligonos)
+    obtenido = processor.remove_overlaps(poligonos)
+
+    assert list(obtenido['evento_id']) == list(esperado['evento_id'])
+    assert list(obtenido['fecha']) == list(esperado['fecha'])
+    for a, b in zip(obtenido.geometry, esperado.geometry):
+        assert a.symmetric_difference(b).area < 1e-6
+
+
+def test_ids_unicos_iguales_a_los_originales(processor):
+    fechas = pd.to_datetime(['2025-08-01', '2025-09-15', '2025-12-31', '2025-04-02', '2025-10-10'])
+    geometrias = [
+        Point(812_345.6, 9_765_432.1).buffer(300),   # UTM, como en el pipeline
+        Point(1_000_000.0, 10_000_000.0),            # potencias de 10 exactas
+        Point(-79.51, -2.003),                       # grados: ruta de cadenas
+        Point(0.5, 7.25),
+        shapely.Polygon(),                           # sin centroide
+    ]
+    esperados = [id_unico_original(f, g) for f, g in zip(fechas, geometrias)]
+    np.testing.assert_array_equal(processor.generate_unique_ids(fechas, geometrias), esperados)
@@ -0,0 +1,31 @@
+import numpy as np
+
+import scheduler
+from event_executor import EventExecutor
+from fire_geometry import event_polygons
+
+
+def eventos(n, semilla=5):
+    rng = np.random.default_rng(semilla)
+    puntos, fechas = [], []
+    for _ in range(n):
+        tamano = int(rng.integers(5, 40))
+        puntos.append(rng.normal(0, 500, (tamano, 2)) + [800_000, 9_800_000])
+        fechas.append(np.datetime64('2025-08-01') + np.sort(rng.integers(0, 5, tamano)).astype('timedelta64[D]'))
+    return puntos, fechas
+
+
+def test_pool_de_procesos_igual_que_en_serie():
+    puntos, fechas = eventos(8)
+    en_pool = EventExecutor(max_workers=2).map(event_polygons, puntos, fechas)
+    en_serie = EventExecutor(serial=True).map(event_polygons, puntos, fechas)
+
+    assert len(en_pool) == len(en_serie) == 8
+    for dias_pool, dias_serie in zip(en_pool, en_serie):
+        assert [f for f, _ in dias_pool] == [f for f, _ in dias_serie]
+        assert all(a.equals_exact(b, 0) for (_, a), (_, b) in zip(dias_pool, dias_serie))
+
+
+def test_importar_el_scheduler_no_programa_tareas():
+    # Los procesos spawn reimportan el módulo principal: programar es cosa del arranque
+    assert "process-fires" not in scheduler.scheduler_instance.tareas
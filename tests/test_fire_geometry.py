@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from benchmark import diferencia_poligonos, poligonos_original
+from fire_geometry import event_polygons
+
+# Los polígonos diarios incrementales se comparan con la triangulación completa
+# por día de antes de user-005 (benchmark.poligonos_original).
+
+ORIGEN = np.array([700_000.0, 9_800_000.0])
+RESTO = [[150, 500], [500, 150], [600, 600], [-300, 200], [900, -100], [250, 950]]
+
+
+def evento(inicio, dias=(4, 2, 3)):
+    """Puntos UTM que arrancan con ``inicio`` y crecen durante ``len(dias)`` días"""
+    puntos = np.array(inicio + RESTO, dtype=float)[:sum(dias)] + ORIGEN
+    fechas = np.repeat(np.datetime64('2025-08-01') + np.arange(len(dias)), dias)
+    return puntos, fechas
+
+
+@pytest.mark.parametrize("inicio", [
+    [[0, 0], [0, 0], [300, 0], [0, 300], [300, 300]],   # duplicado
+    [[0, 0], [300, 0], [0, 300], [300, 300]],           # cocirculares
+    [[0, 0], [400, 100], [100, 350], [-200, -50]],      # posición general
+], ids=["duplicado", "cocirculares", "general"])
+def test_inicio_degenerado_no_pierde_dias(inicio):
+    puntos, fechas = evento(inicio)
+    obtenidos = event_polygons(puntos, fechas)
+
+    assert all(poligono is not None for _, poligono in obtenidos)
+    assert diferencia_poligonos(obtenidos, poligonos_original(puntos, fechas)) < 1e-12
+
+
+def test_puntos_alineados_igual_que_la_referencia():
+    # Sin área no hay triangulación posible: el día queda sin polígono en ambos
+    puntos, fechas = evento([[0, 0], [100, 0], [200, 0], [300, 0]])
+    obtenidos = event_polygons(puntos, fechas)
+
+    assert obtenidos[0][1] is None
+    assert diferencia_poligonos(obtenidos, poligonos_original(puntos, fechas)) < 1e-12
@@ -0,0 +1,109 @@
+import gzip
+from datetime import date
+
+import pytest
+import requests
+
+import firms_client
+from firms_client import FirmsClient
+
+CSV = (b"latitude,longitude,acq_date,acq_time\n"
+       b"-2.1,-79.9,2025-08-01,612\n"
+       b"-2.2,-79.8,2025-08-01,1750\n")
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Reemplaza el sleep del backoff y registra cuánto se habría esperado"""
+    registro = []
+    monkeypatch.setattr(firms_client.time, 'sleep', registro.append)
+    return registro
+
+
+def cliente(servidor, **kwargs):
+    kwargs.setdefault('timeout', 5)
+    return FirmsClient(servidor.url, "CLAVE", [-92.0, -5.0, -75.2, 1.7], 2, **kwargs)
+
+
+def secuencia(*respuestas):
+    """Responde en orden; la última se repite"""
+    pendientes = list(respuestas)
+    return lambda peticion: pendientes.pop(0) if len(pendientes) > 1 else pendientes[0]
+
+
+def test_url_de_la_api_de_area(servidor):
+    servidor.responder = lambda peticion: (200, CSV, {})
+    df = cliente(servidor).fetch("VIIRS_SNPP_NRT", date(2025, 8, 1))
+
+    assert len(df) == 2
+    assert servidor.peticiones[0].ruta == "/CLAVE/VIIRS_SNPP_NRT/-92.0,-5.0,-75.2,1.7/2/2025-08-01"
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_reintenta_con_backoff(servidor, esperas, status):
+    servidor.responder = secuencia((status, b'', {}), (status, b'', {}), (200, CSV, {}))
+    df = cliente(servidor, max_retries=3, backoff_factor=0.5).fetch("VIIRS_SNPP_NRT", date(2025, 8, 1))
+
+    assert len(df) == 2
+    assert len(servidor.peticiones) == 3
+    assert esperas == [0.5, 1.0]
+
+
+def test_no_reintenta_errores_del_cliente(servidor, esperas):
+    servidor.responder = lambda peticion: (403, b'Forbidden', {})
+    df = cliente(servidor).fetch("VIIRS_SNPP_NRT", date(2025, 8, 1))
+
+    assert df.empty
+    assert len(servidor.peticiones) == 1
+    assert esperas == []
+
+
+def test_agotados_los_reintentos_strict_lanza_y_lenient_devuelve_vacio(servidor, esperas):
+    servidor.responder = lambda peticion: (503, b'', {})
+    firms = cliente(servidor, max_retries=2)
+
+    assert firms.fetch("VIIRS_SNPP_NRT", date(2025, 8, 1)).empty
+    with pytest.raises(requests.HTTPError):
+        firms.fetch("VIIRS_SNPP_NRT", date(2025, 8, 1), strict=True)
+    assert len(servidor.peticiones) == 6
+
+
+def test_respuesta_de_texto_invalida(servidor):
+    # FIRMS responde 200 con un mensaje cuando la clave no es válida
+    servidor.responder = lambda peticion: (200, b"Invalid MAP_KEY.\n", {})
+    firms = cliente(servidor)
+
+    assert firms.fetch("VIIRS_SNPP_NRT", date(2025, 8, 1)).empty
+    with pytest.raises(ValueError):
+        firms.fetch("VIIRS_SNPP_NRT", date(2025, 8, 1), strict=True)
+
+
+def test_csv_por_partes_y_comprimido(servidor):
+    filas = b"".join(b"-2.%d,-79.%d,2025-08-01,%04d\n" % (i % 10, i % 7, i % 2400) for i in range(20_000))
+    cuerpo = gzip.compress(CSV + filas)
+    partes = [cuerpo[i:i + 4096] for i in range(0, len(cuerpo), 4096)]
+    servidor.responder = lambda peticion: (200, partes, {'Content-Encoding': 'gzip'})
+
+    df = cliente(servidor).fetch("VIIRS_SNPP_NRT", date(2025, 8, 1))
+    assert len(df) == 20_002
+    assert list(df.columns) == ['latitude', 'longitude', 'acq_date', 'acq_time']
+
+
+def test_cuerpo_vacio_es_un_dataframe_vacio(servidor):
+    servidor.responder = lambda peticion: (200, b'', {})
+    assert cliente(servidor).fetch("VIIRS_SNPP_NRT", date(2025, 8, 1), strict=True).empty
+
+
+def test_fetch_all_aisla_las_fuentes_que_fallan(servidor, esperas):
+    servidor.responder = lambda peticion: (500, b'', {}) if "NOAA20" in peticion.ruta else (200, CSV, {})
+    descargas = cliente(servidor, max_retries=1).fetch_all(
+        ["VIIRS_NOAA20_NRT", "VIIRS_SNPP_NRT"], date(2025, 8, 1)
+    )
+
+    assert list(descargas) == ["VIIRS_NOAA20_NRT", "VIIRS_SNPP_NRT"]
+    assert descargas["VIIRS_NOAA20_NRT"].empty
+    assert len(descargas["VIIRS_SNPP_NRT"]) == 2
+
+    with pytest.raises(requests.HTTPError):
+        cliente(servidor, max_retries=0).fetch_all(["VIIRS_NOAA20_NRT", "VIIRS_SNPP_NRT"],
+                                                   date(2025, 8, 1), strict=True)
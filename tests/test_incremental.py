@@ -0,0 +1,146 @@
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+
+import fire_processor
+from fire_processor import FireProcessor
+
+# El modo incremental (almacén de detecciones + re-agrupar solo lo que tocan
+# las nuevas) debe dejar los mismos eventos que agrupar todo de una vez.
+
+INICIO = datetime(2025, 8, 1)
+FUENTES = ['VIIRS_NOAA20_NRT', 'VIIRS_SNPP_NRT']
+
+
+class Reloj(datetime):
+    """``datetime`` cuyo ``now()`` es la hora simulada de cada ejecución"""
+    ahora = INICIO
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.ahora
+
+
+class FirmsFalso:
+    """Publica cada detección el día ``publicada`` (algunas llegan tarde)"""
+
+    def __init__(self, detecciones):
+        self.detecciones = detecciones
+
+    def fetch_all(self, sources, date, day_range=None, strict=False):
+        hoy = (Reloj.ahora - INICIO).days
+        visibles = self.detecciones[(self.detecciones['publicada'] <= hoy) &
+                                    (self.detecciones['acq_date'] >= date.strftime('%Y-%m-%d'))]
+        return {
+            source: visibles[visibles['fuente'] == source].drop(columns=['fuente', 'publicada']).reset_index(drop=True)
+            for source in sources
+        }
+
+
+def detecciones(x, y, dias, horas=None, fuentes=None, publicada=None):
+    """Tabla tipo FIRMS a partir de coordenadas EPSG:32717 y días desde INICIO"""
+    dias = np.asarray(dias)
+    geo = gpd.GeoSeries(gpd.points_from_xy(x, y), crs='EPSG:32717').to_crs('EPSG:4326')
+    return pd.DataFrame({
+        'latitude': np.round(geo.y.values, 5),
+        'longitude': np.round(geo.x.values, 5),
+        'acq_date': (pd.Timestamp(INICIO) + pd.to_timedelta(dias, unit='D')).strftime('%Y-%m-%d'),
+        'acq_time': horas if horas is not None else np.full(len(dias), 600),
+        'fuente': fuentes if fuentes is not None else FUENTES[0],
+        'publicada': publicada if publicada is not None else dias,
+    })
+
+
+@pytest.fixture
+def procesar(tmp_path, monkeypatch):
+    """Corre el modo incremental una vez por día y devuelve el almacén resultante"""
+    monkeypatch.setenv('FIRE_STORE_PATH', str(tmp_path / "detecciones.sqlite"))
+    monkeypatch.setenv('FIRE_SERIAL', '1')
+    monkeypatch.setattr(fire_processor, 'datetime', Reloj)
+
+    def procesar(datos, dias):
+        processor = FireProcessor()
+        processor.sources = FUENTES
+        processor.firms_client = FirmsFalso(datos)
+        for dia in range(dias):
+            Reloj.ahora = INICIO + timedelta(days=dia, hours=12)
+            seleccion = processor.update_fire_data()
+            if seleccion.empty:
+                continue
+            agrupadas = processor.assign_event_ids(seleccion)
+            if not agrupadas.empty:
+                processor.detection_store.assign_events(agrupadas)
+        return processor.detection_store
+
+    return procesar
+
+
+def clave(df):
+    return list(zip(df['latitude'], df['longitude'], df['acq_date'], df['acq_time']))
+
+
+def particion(claves, eventos):
+    grupos = {}
+    for c, evento in zip(claves, eventos):
+        grupos.setdefault(evento, set()).add(c)
+    return {frozenset(grupo) for grupo in grupos.values()}
+
+
+def particion_incremental(store):
+    with closing(sqlite3.connect(store.path)) as con:
+        guardadas = pd.read_sql_query("SELECT latitude, longitude, acq_date, acq_time, evento_id FROM detecciones", con)
+    return particion(clave(guardadas), guardadas['evento_id'])
+
+
+def particion_completa(datos, monkeypatch, tmp_path):
+    monkeypatch.setenv('FIRE_STORE_PATH', str(tmp_path / "completo.sqlite"))
+    processor = FireProcessor()
+    processor.incremental = False
+    # Mismo orden que devolvería la descarga completa: por fuente
+    datos = pd.concat([datos[datos['fuente'] == source] for source in FUENTES])
+    incendios = gpd.GeoDataFrame(
+        datos.rename(columns={'acq_date': 'ACQ_DATE', 'acq_time': 'ACQ_TIME', 'fuente': 'SOURCE'}),
+        geometry=gpd.points_from_xy(datos['longitude'], datos['latitude']), crs='EPSG:4326'
+    ).to_crs('EPSG:32717')
+    incendios['ACQ_DATE'] = pd.to_datetime(incendios['ACQ_DATE'])
+
+    agrupadas = processor.assign_event_ids(incendios)
+    agrupadas['acq_date'] = agrupadas['ACQ_DATE'].dt.strftime('%Y-%m-%d')
+    agrupadas['acq_time'] = agrupadas['ACQ_TIME']
+    return particion(clave(agrupadas), agrupadas['evento_id'])
+
+
+def test_varias_ejecuciones_igual_a_agrupar_todo(procesar, monkeypatch, tmp_path):
+    rng = np.random.default_rng(1)
+    n, dias, focos = 1_500, 12, 30
+    foco = rng.integers(0, focos, n)
+    centros = rng.uniform([700_000, 9_750_000], [740_000, 9_790_000], (focos, 2))
+    dia = np.minimum(rng.integers(0, dias, focos)[foco] + rng.integers(0, 5, n), dias - 1)
+    datos = detecciones(
+        centros[foco, 0] + rng.normal(0, 900, n), centros[foco, 1] + rng.normal(0, 900, n), dia,
+        horas=rng.integers(0, 2400, n), fuentes=rng.choice(FUENTES, n),
+        publicada=dia + (rng.random(n) < 0.2)
+    ).drop_duplicates(['latitude', 'longitude', 'acq_date', 'acq_time'])
+
+    store = procesar(datos, dias + 2)
+    assert particion_incremental(store) == particion_completa(datos, monkeypatch, tmp_path)
+
+
+def test_evento_alcanzado_indirectamente_se_re_agrupa(procesar, monkeypatch, tmp_path):
+    # A y B (un día después) forman un evento. D, del mismo día que A, está cerca
+    # de B pero no de A: como el flood fill solo avanza en el tiempo, queda
+    # aparte. P llega tarde, cerca solo de D y adquirida antes que A: arrastra a
+    # D y, desde D, a B, que está en un evento que P no toca directamente.
+    x = [0, 0, 0, 800]
+    y = [0, 800, 1_600, 2_100]
+    datos = detecciones(np.add(x, 720_000), np.add(y, 9_770_000), [0, 1, 0, 0],
+                        horas=[900, 900, 1000, 100], publicada=[0, 1, 0, 2])
+
+    store = procesar(datos, 3)
+    assert particion_incremental(store) == particion_completa(datos, monkeypatch, tmp_path)
+    assert store.totals() == {"detecciones": 4, "eventos": 2}
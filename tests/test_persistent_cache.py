@@ -0,0 +1,59 @@
+import multiprocessing
+
+import pytest
+
+from persistent_cache import CacheBackend, FileCacheBackend, SQLiteCacheBackend, make_backend
+
+ESCRITURAS = 50
+PROCESOS = 4
+
+
+def escribir(url, clave):
+    backend = make_backend(url)
+    for i in range(ESCRITURAS):
+        backend.set(clave, {'i': i})
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def url(request, tmp_path):
+    if request.param == 'sqlite':
+        return f"sqlite:///{tmp_path / 'cache.sqlite'}"
+    return f"file:///{tmp_path / 'cache'}"
+
+
+def test_la_base_es_abstracta():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_version_ttl_y_borrado(url):
+    backend = make_backend(url)
+    assert backend.version('x') is None
+
+    assert backend.set('x', {'a': 1})['version'] == 1
+    assert backend.set('x', {'a': 2}, ttl=-1)['version'] == 2
+    assert backend.get('x') is None
+    assert backend.get('x', incluir_vencidas=True)['valor'] == {'a': 2}
+
+    backend.delete('x')
+    assert backend.version('x') is None
+
+
+def test_escrituras_concurrentes_no_repiten_versiones(url):
+    # Cada set incrementa la versión una vez, también entre procesos
+    contexto = multiprocessing.get_context('fork')
+    procesos = [contexto.Process(target=escribir, args=(url, 'compartida')) for _ in range(PROCESOS)]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join()
+
+    assert all(proceso.exitcode == 0 for proceso in procesos)
+    assert make_backend(url).version('compartida') == PROCESOS * ESCRITURAS
+
+
+def test_make_backend_por_url(tmp_path):
+    assert isinstance(make_backend(f"sqlite:///{tmp_path / 'c.sqlite'}"), SQLiteCacheBackend)
+    assert isinstance(make_backend(f"file:///{tmp_path / 'c'}"), FileCacheBackend)
+    with pytest.raises(ValueError):
+        make_backend("redis://localhost")
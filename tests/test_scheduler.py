@@ -0,0 +1,133 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from job_manager import JobManager
+from persistent_cache import SQLiteCacheBackend
+from scheduler import FireScheduler, sondeo_incendios
+
+# Las verificaciones de origen se reemplazan por funciones que devuelven una
+# firma fija (o lanzan un error) y los pipelines por trabajos triviales.
+
+INICIO = datetime(2026, 10, 18, 7, 0, tzinfo=timezone.utc)
+
+
+class Origen:
+    """Verificación falsa: devuelve ``firma`` o lanza si ``falla``"""
+
+    def __init__(self, firma):
+        self.firma = firma
+        self.falla = False
+        self.consultas = 0
+
+    def __call__(self):
+        self.consultas += 1
+        if self.falla:
+            raise ConnectionError("origen caído")
+        return self.firma
+
+
+class Pipeline:
+    """Lanza trabajos reales en un JobManager con un resultado fijo"""
+
+    def __init__(self, resultado=None):
+        self.jobs = JobManager(max_workers=1)
+        self.resultado = resultado or {"success": True, "stats": {}}
+        self.lanzados = 0
+
+    def __call__(self):
+        self.lanzados += 1
+        return self.jobs.submit("pipeline", lambda job: self.resultado)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return FireScheduler(store=SQLiteCacheBackend(str(tmp_path / "cache.sqlite")), intervalo=0)
+
+
+def correr(scheduler, ahora, minutos=15, veces=1):
+    """Hace ``veces`` ticks separados por ``minutos`` esperando a que terminen los trabajos"""
+    for _ in range(veces):
+        scheduler.tick(ahora)
+        for tarea in scheduler.tareas.values():
+            while tarea.job is not None and not tarea.job.finished:
+                time.sleep(0.01)
+        ahora += timedelta(minutes=minutos)
+    return ahora
+
+
+def test_solo_corre_cuando_cambia_la_firma(scheduler):
+    origen, pipeline = Origen({"VIIRS_SNPP_NRT": [5, "2026-10-18 0612"]}), Pipeline()
+    scheduler.add_task("process-fires", pipeline, "06:00", check=origen, sondeo=900)
+
+    ahora = correr(scheduler, INICIO, veces=4)
+    assert pipeline.lanzados == 1
+
+    origen.firma = {"VIIRS_SNPP_NRT": [7, "2026-10-18 0750"]}
+    correr(scheduler, ahora, veces=4)
+    assert pipeline.lanzados == 2
+
+
+def test_sin_datos_nuevos_guarda_la_firma(scheduler):
+    # La ventana de FIRMS cambia de día: la firma cambia aunque no haya nada que procesar
+    origen = Origen({"VIIRS_SNPP_NRT": [5, "2026-10-18 0612"]})
+    pipeline = Pipeline({"success": True, "skipped": True, "message": "No hay detecciones nuevas"})
+    scheduler.add_task("process-fires", pipeline, "06:00", check=origen, sondeo=900)
+
+    ahora = correr(scheduler, INICIO, veces=2)
+    origen.firma = {"VIIRS_SNPP_NRT": [3, "2026-10-18 0612"]}
+    correr(scheduler, ahora, veces=8)
+
+    assert pipeline.lanzados == 2
+    assert scheduler._firma("process-fires") == origen.firma
+
+
+def test_error_no_relanza_en_cada_sondeo(scheduler):
+    origen = Origen({"VIIRS_SNPP_NRT": [5, "2026-10-18 0612"]})
+    pipeline = Pipeline({"success": False, "error": "Supabase no responde"})
+    scheduler.add_task("process-fires", pipeline, "06:00", check=origen, sondeo=900)
+
+    correr(scheduler, INICIO, veces=8)
+    assert pipeline.lanzados == 1
+
+
+def test_respeta_el_periodo_de_sondeo(scheduler):
+    origen, pipeline = Origen({"x": 1}), Pipeline()
+    scheduler.add_task("process-fires", pipeline, "06:00", check=origen, sondeo=900)
+
+    correr(scheduler, INICIO, minutos=5, veces=7)
+    assert origen.consultas == 3
+
+
+def test_si_la_verificacion_falla_usa_el_horario(scheduler):
+    origen, pipeline = Origen({"x": 1}), Pipeline()
+    origen.falla = True
+    scheduler.add_task("process-fires", pipeline, "06:00,12:00", check=origen, sondeo=900)
+
+    # 07:00 atiende el horario de las 06:00 una sola vez; a las 12:00 vuelve a correr
+    correr(scheduler, INICIO, minutos=60, veces=4)
+    assert pipeline.lanzados == 1
+    correr(scheduler, INICIO.replace(hour=12, minute=5))
+    assert pipeline.lanzados == 2
+
+
+def test_se_pone_al_dia_con_horarios_perdidos(scheduler):
+    pipeline = Pipeline()
+    scheduler.add_task("process-fires", pipeline, "06:00,12:00,18:00")
+
+    # Caído desde la víspera: los horarios perdidos se atienden con una sola ejecución
+    correr(scheduler, INICIO, minutos=1, veces=3)
+    assert pipeline.lanzados == 1
+
+
+def test_otro_worker_no_guarda_la_firma(scheduler):
+    origen = Origen({"x": 1})
+    scheduler.add_task("process-fires", lambda: (None, False), "06:00", check=origen, sondeo=900)
+
+    correr(scheduler, INICIO)
+    assert scheduler._firma("process-fires") is None
+
+
+def test_temporada_de_incendios_sondea_mas_seguido():
+    assert sondeo_incendios(datetime(2026, 9, 1)) < sondeo_incendios(datetime(2026, 3, 1))
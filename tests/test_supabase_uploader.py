@@ -0,0 +1,125 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import supabase_client
+from supabase_client import SupabaseClient, SupabaseUploader
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    registro = []
+    monkeypatch.setattr(supabase_client.time, 'sleep', registro.append)
+    return registro
+
+
+def uploader(servidor, **kwargs):
+    kwargs.setdefault('backoff_factor', 0.5)
+    return SupabaseUploader(SupabaseClient(servidor.url, "CLAVE", timeout=5), 'incendios_grandes', **kwargs)
+
+
+def eventos(filas_por_evento, relleno=0):
+    """Registros de varios eventos, contiguos como los arma save_to_supabase"""
+    return [{'evento_id': evento, 'fecha': f"2025-08-{dia + 1:02d}", 'geom': 'x' * relleno}
+            for evento, filas in enumerate(filas_por_evento, start=1) for dia in range(filas)]
+
+
+def grupos_por_lote(peticiones):
+    return [[fila['evento_id'] for fila in json.loads(p.cuerpo)] for p in peticiones]
+
+
+def assert_grupos_enteros(lotes, filas_por_evento):
+    """Cada evento llega completo y en un solo lote"""
+    vistos = {}
+    for numero, lote in enumerate(lotes):
+        for evento in lote:
+            assert vistos.setdefault(evento, numero) == numero
+    for evento, filas in enumerate(filas_por_evento, start=1):
+        assert sum(lote.count(evento) for lote in lotes) == filas
+
+
+@pytest.mark.parametrize("limites", [{'max_batch_rows': 10}, {'max_batch_bytes': 2_000}])
+def test_lotes_por_filas_y_bytes_sin_partir_eventos(limites):
+    filas_por_evento = [3, 7, 1, 4, 6, 2, 5]
+    registros = eventos(filas_por_evento, relleno=100)
+    lotes = SupabaseUploader(None, 'incendios_grandes', **limites).build_batches(registros, grupo='evento_id')
+
+    assert len(lotes) > 1
+    assert_grupos_enteros([[clave for clave, _ in lote] for lote in lotes], filas_por_evento)
+    for lote in lotes:
+        assert len(lote) <= limites.get('max_batch_rows', 1000)
+        assert sum(len(cuerpo) + 1 for _, cuerpo in lote) <= limites.get('max_batch_bytes', 2_000_000)
+
+
+def test_un_evento_mas_grande_que_el_limite_va_solo():
+    lotes = SupabaseUploader(None, 't', max_batch_rows=4).build_batches(eventos([2, 9, 2]), grupo='evento_id')
+    assert [[clave for clave, _ in lote] for lote in lotes] == [[1, 1], [2] * 9, [3, 3]]
+
+
+def test_upsert_con_merge_duplicates_y_on_conflict(servidor):
+    servidor.responder = lambda peticion: (201, b'', {})
+    resumen = uploader(servidor, on_conflict='evento_id,fecha').upload(eventos([2, 3]), grupo='evento_id')
+
+    assert resumen == {'rows': 5, 'batches': 1, 'failed': 0, 'keys': {1, 2}, 'errors': []}
+    peticion = servidor.peticiones[0]
+    url = urlparse(peticion.ruta)
+    assert peticion.metodo == 'POST' and url.path == '/rest/v1/incendios_grandes'
+    assert parse_qs(url.query) == {'on_conflict': ['evento_id,fecha']}
+    assert 'resolution=merge-duplicates' in peticion.cabeceras['Prefer']
+    assert peticion.cabeceras['Content-Type'] == 'application/json'
+    assert peticion.cabeceras['apikey'] == 'CLAVE'
+
+
+def test_sin_restriccion_unica_sigue_por_la_clave_primaria(servidor):
+    def responder(peticion):
+        if 'on_conflict' in peticion.ruta:
+            return 400, b'{"code":"42P10","message":"there is no unique or exclusion constraint"}', {}
+        return 201, b'', {}
+    servidor.responder = responder
+
+    resumen = uploader(servidor, on_conflict='evento_id,fecha').upload(eventos([2]), grupo='evento_id')
+    assert resumen['failed'] == 0
+    assert [p.ruta for p in servidor.peticiones] == ['/rest/v1/incendios_grandes?on_conflict=evento_id%2Cfecha',
+                                                     '/rest/v1/incendios_grandes']
+
+
+def test_413_parte_en_cambios_de_evento(servidor):
+    filas_por_evento = [4, 1, 3, 5, 2, 3]
+    servidor.responder = lambda peticion: (413, b'', {}) if len(json.loads(peticion.cuerpo)) > 6 else (201, b'', {})
+
+    resumen = uploader(servidor).upload(eventos(filas_por_evento), grupo='evento_id')
+    aceptados = grupos_por_lote(p for p in servidor.peticiones if len(json.loads(p.cuerpo)) <= 6)
+
+    assert resumen['failed'] == 0 and resumen['rows'] == sum(filas_por_evento)
+    assert_grupos_enteros(aceptados, filas_por_evento)
+
+
+def test_413_de_un_solo_evento_no_se_parte(servidor):
+    servidor.responder = lambda peticion: (413, b'Payload Too Large', {})
+    resumen = uploader(servidor).upload(eventos([8]), grupo='evento_id')
+
+    assert resumen['failed'] == 1 and resumen['rows'] == 0
+    assert '413' in resumen['errors'][0]
+    assert len(servidor.peticiones) == 1
+
+
+@pytest.mark.parametrize("status", [429, 502])
+def test_reintenta_con_backoff(servidor, esperas, status):
+    respuestas = [(status, b'', {}), (status, b'', {}), (201, b'', {})]
+    servidor.responder = lambda peticion: respuestas.pop(0)
+
+    resumen = uploader(servidor, max_retries=3).upload(eventos([2]), grupo='evento_id')
+    assert resumen['failed'] == 0
+    assert len(servidor.peticiones) == 3
+    assert esperas == [0.5, 1.0]
+
+
+def test_error_del_cliente_no_se_reintenta_ni_detiene_otros_lotes(servidor, esperas):
+    servidor.responder = lambda peticion: ((400, b'{"message":"bad"}', {}) if '"evento_id": 1' in peticion.cuerpo.decode()
+                                           else (201, b'', {}))
+    resumen = uploader(servidor, max_batch_rows=2).upload(eventos([2, 2]), grupo='evento_id')
+
+    assert resumen['failed'] == 1 and resumen['keys'] == {2}
+    assert len(servidor.peticiones) == 2
+    assert esperas == []
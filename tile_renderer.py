@@ -0,0 +1,218 @@
+import os
+import json
+import math
+import shutil
+import struct
+import zlib
+import threading
+import ee
+import numpy as np
+from datetime import datetime
+
+TILE_SIZE = 256
+
+
+def download_classes(imagen, bounds, resolucion):
+    """Descarga una imagen de clases de EE como arreglo uint8 en una grilla EPSG:4326.
+
+    ``bounds`` es [oeste, sur, este, norte] y ``resolucion`` el tamaño de
+    píxel en grados. Se usa computePixels, que devuelve el arreglo en una sola
+    respuesta sin pasar por una exportación.
+    """
+    oeste, sur, este, norte = bounds
+    ancho = int(math.ceil((este - oeste) / resolucion))
+    alto = int(math.ceil((norte - sur) / resolucion))
+
+    pixeles = ee.data.computePixels({
+        'expression': imagen,
+        'fileFormat': 'NUMPY_NDARRAY',
+        'grid': {
+            'dimensions': {'width': ancho, 'height': alto},
+            'affineTransform': {
+                'scaleX': resolucion, 'shearX': 0, 'translateX': oeste,
+                'shearY': 0, 'scaleY': -resolucion, 'translateY': norte
+            },
+            'crsCode': 'EPSG:4326'
+        }
+    })
+
+    # Arreglo estructurado con un campo por banda; las clases van en la primera
+    if pixeles.dtype.names:
+        pixeles = pixeles[pixeles.dtype.names[0]]
+    return np.nan_to_num(np.asarray(pixeles, dtype=float)).astype(np.uint8)
+
+
+def png_paletted(indices, paleta, alfas):
+    """PNG de 8 bits con paleta (sin dependencias): ``indices`` es un arreglo (alto, ancho)"""
+    alto, ancho = indices.shape
+
+    def bloque(tipo, datos):
+        return (struct.pack('>I', len(datos)) + tipo + datos
+                + struct.pack('>I', zlib.crc32(tipo + datos) & 0xffffffff))
+
+    # Cada fila lleva delante el byte de filtro 0 (ninguno)
+    filas = np.hstack([np.zeros((alto, 1), dtype=np.uint8), indices.astype(np.uint8)])
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + bloque(b'IHDR', struct.pack('>IIBBBBB', ancho, alto, 8, 3, 0, 0, 0))
+            + bloque(b'PLTE', bytes(paleta))
+            + bloque(b'tRNS', bytes(alfas))
+            + bloque(b'IDAT', zlib.compress(filas.tobytes(), 6))
+            + bloque(b'IEND', b''))
+
+
+class TileRenderer:
+    """Pirámide XYZ de teselas PNG a partir de un ráster local de clases.
+
+    Cada actualización guarda el ráster de clases (p. ej. FDI 1-6) como una
+    versión nueva en ``directorio/<version>/``; las teselas se dibujan al
+    pedirlas (o por adelantado con ``prerender``) y quedan en disco junto al
+    ráster, así que navegar el mapa no vuelve a tocar Earth Engine. La versión
+    forma parte del ETag. Al activar una versión nueva se borran las
+    anteriores que fueron reemplazadas hace más de ``retencion`` segundos;
+    mientras tanto otros workers que aún no recargaron pueden seguir
+    sirviéndolas. El ráster guardado se activa con ``load()``.
+    """
+
+    def __init__(self, directorio, colores, opacidad=1.0, retencion=3600):
+        self.directorio = directorio
+        self.retencion = retencion
+        # Clase 0 transparente; la clase i usa colores[i - 1]
+        self.paleta = [0, 0, 0] + [int(c[i:i + 2], 16) for c in colores for i in (0, 2, 4)]
+        self.alfas = [0] + [round(255 * opacidad)] * len(colores)
+        self._lock = threading.Lock()
+        self._raster = None
+        self._vacia = png_paletted(np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8), self.paleta, self.alfas)
+
+    @property
+    def version(self):
+        return self._raster['version'] if self._raster else None
+
+    def save(self, clases, bounds, resolucion):
+        """Guarda un ráster nuevo, lo activa y devuelve su versión"""
+        version = datetime.now().strftime('%Y%m%d%H%M%S')
+        carpeta = os.path.join(self.directorio, version)
+        os.makedirs(carpeta, exist_ok=True)
+
+        np.save(os.path.join(carpeta, 'clases.npy'), np.asarray(clases, dtype=np.uint8))
+        self._escribir(os.path.join(self.directorio, 'actual.json'), json.dumps({
+            'version': version, 'bounds': list(bounds), 'resolucion': resolucion
+        }).encode())
+
+        self.load()
+        self._limpiar(version)
+        return version
+
+    def load(self):
+        """Activa la versión indicada en actual.json (si existe)"""
+        try:
+            with open(os.path.join(self.directorio, 'actual.json')) as f:
+                meta = json.load(f)
+            clases = np.load(os.path.join(self.directorio, meta['version'], 'clases.npy'))
+        except (OSError, ValueError, KeyError):
+            return False
+
+        with self._lock:
+            self._raster = {**meta, 'clases': clases}
+        return True
+
+    def etag(self, z, x, y):
+        version = self.version
+        return f'"{version}-{z}-{x}-{y}"' if version else None
+
+    def tile(self, z, x, y):
+        """(png, etag) de la tesela; None si no hay ráster o la tesela no existe"""
+        raster = self._raster
+        if raster is None or z < 0 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return None
+
+        etag = f'"{raster["version"]}-{z}-{x}-{y}"'
+        ruta = os.path.join(self.directorio, raster['version'], str(z), str(x), f"{y}.png")
+
+        try:
+            with open(ruta, 'rb') as f:
+                return f.read(), etag
+        except FileNotFoundError:
+            pass
+
+        png = self._dibujar(raster, z, x, y)
+        # Si la versión ya se borró (la reemplazó otro worker) no se vuelve a crear
+        if os.path.isdir(os.path.join(self.directorio, raster['version'])):
+            try:
+                self._escribir(ruta, png)
+            except OSError as e:
+                print(f"⚠️ No se guardó la tesela {z}/{x}/{y}: {e}")
+        return png, etag
+
+    def prerender(self, max_zoom):
+        """Dibuja por adelantado las teselas que cubren el ráster hasta ``max_zoom``"""
+        raster = self._raster
+        if raster is None:
+            return 0
+
+        oeste, sur, este, norte = raster['bounds']
+        total = 0
+        for z in range(max_zoom + 1):
+            x0, y0 = self._tesela(oeste, norte, z)
+            x1, y1 = self._tesela(este, sur, z)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    self.tile(z, x, y)
+                    total += 1
+        return total
+
+    def _dibujar(self, raster, z, x, y):
+        oeste, sur, este, norte = raster['bounds']
+        resolucion = raster['resolucion']
+        clases = raster['clases']
+
+        # Centro de cada píxel de la tesela en lon/lat (Web Mercator)
+        n = 2 ** z
+        pasos = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+        lon = (x + pasos) / n * 360.0 - 180.0
+        lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + pasos) / n))))
+
+        columnas = np.floor((lon - oeste) / resolucion).astype(np.int64)
+        filas = np.floor((norte - lat) / resolucion).astype(np.int64)
+        col_ok = (columnas >= 0) & (columnas < clases.shape[1])
+        fil_ok = (filas >= 0) & (filas < clases.shape[0])
+
+        if not col_ok.any() or not fil_ok.any():
+            return self._vacia
+
+        indices = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+        indices[np.ix_(fil_ok, col_ok)] = clases[np.ix_(filas[fil_ok], columnas[col_ok])]
+        indices[indices >= len(self.alfas)] = 0
+        return png_paletted(indices, self.paleta, self.alfas)
+
+    @staticmethod
+    def _tesela(lon, lat, z):
+        n = 2 ** z
+        lat = max(min(lat, 85.0511), -85.0511)
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    @staticmethod
+    def _escribir(ruta, contenido):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+
+    def _limpiar(self, actual):
+        versiones = sorted(nombre for nombre in os.listdir(self.directorio)
+                           if os.path.isdir(os.path.join(self.directorio, nombre)))
+        ahora = datetime.now()
+
+        # Cada versión quedó reemplazada cuando se creó la siguiente
+        for version, siguiente in zip(versiones, versiones[1:]):
+            if version == actual:
+                continue
+            try:
+                reemplazada = datetime.strptime(siguiente, '%Y%m%d%H%M%S')
+            except ValueError:
+                continue
+            if (ahora - reemplazada).total_seconds() > self.retencion:
+                shutil.rmtree(os.path.join(self.directorio, version), ignore_errors=True)
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+from firms_client import FirmsClient
+
+# Verificaciones baratas de si las fuentes publicaron datos nuevos. Cada
+# verificación es un callable sin argumentos que devuelve una firma (JSON) del
+# estado de la fuente: si la firma cambia respecto a la última procesada, vale
+# la pena correr el pipeline. Si la fuente no responde, lanzan la excepción
+# para que el scheduler no confunda un error con "sin cambios". En pruebas se
+# pueden reemplazar por cualquier función que devuelva una firma. La de Earth
+# Engine (isc_pipeline.ultimas_publicaciones) se arma en main.py para pasar
+# por el pool acotado de EE.
+
+
+class FirmsCheck:
+    """Filas y última adquisición por fuente de FIRMS en los últimos ``dias`` (UTC)"""
+
+    def __init__(self, main_url, map_key, area_coords, sources, dias=2, timeout=30):
+        self.sources = sources
+        self.dias = dias
+        self.client = FirmsClient(main_url, map_key, area_coords, dias, timeout=timeout, max_retries=1)
+
+    def __call__(self):
+        desde = datetime.now(timezone.utc).date() - timedelta(days=self.dias - 1)
+        descargas = self.client.fetch_all(self.sources, desde, self.dias, strict=True)
+
+        firma = {}
+        for source, df in descargas.items():
+            if df.empty:
+                firma[source] = [0, None]
+                continue
+            ultima = (df['acq_date'].astype(str) + ' ' + df['acq_time'].astype(str).str.zfill(4)).max()
+            firma[source] = [len(df), ultima]
+        return firma